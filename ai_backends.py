@@ -0,0 +1,139 @@
+"""
+AI backend interface for Arabic Typing Helper
+
+A backend turns a prompt into response text, whole or streamed. The Gemini
+backend lives in gemini_ai_helper; FakeBackend replays recorded responses
+with simulated latency and failures so the request pipeline can be
+load-tested and benchmarked without network access.
+"""
+
+import hashlib
+import json
+import random
+import threading
+
+
+class AIBackend:
+    """Base class for AI backends"""
+
+    def get_settings(self):
+        """Request settings: at least "model", "stream" and "timeout" """
+        raise NotImplementedError
+
+    def generate(self, prompt, token, system_instruction=None, response_schema=None):
+        """
+        Return the whole response text for prompt. With response_schema the
+        response is a JSON object of that shape.
+        """
+        raise NotImplementedError
+
+    def stream(self, prompt, token, system_instruction=None, response_schema=None):
+        """Yield response text chunk by chunk; by default the whole response at once"""
+        yield self.generate(prompt, token, system_instruction, response_schema)
+
+
+# Structured responses in the shape of the schemas in prompt_templates, used
+# when no recording is configured
+DEFAULT_RESPONSES = [
+    '{\n  "answer": "بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ",\n'
+    '  "penjelasan": "Basmalah dibaca di awal surah dan sebelum memulai pekerjaan baik.",\n'
+    '  "catatan": "Hasil ini dari AI, cocokkan dengan mushaf sebelum digunakan."\n}',
+    '{"answer": "الْحَمْدُ لِلَّهِ رَبِّ الْعَالَمِينَ", '
+    '"penjelasan": "Pujian kepada Allah sebagai Rabb semesta alam.", '
+    '"catatan": "Teks ini dibuat AI, mohon periksa kembali ke sumber yang sahih."}',
+    '{\n  "answer": "إِنَّمَا الْأَعْمَالُ بِالنِّيَّاتِ",\n'
+    '  "hadith_text": "Sesungguhnya amal itu tergantung niatnya.",\n'
+    '  "hadith_source": "Shahih Bukhari no. 1, Shahih Muslim no. 1907",\n'
+    '  "hadith_warning": "",\n'
+    '  "penjelasan": "Nilai amal ditentukan oleh niat pelakunya.",\n'
+    '  "catatan": "Jawaban AI, tanyakan ke ustadz atau rujuk kitab aslinya.",\n'
+    '  "sumber": "Shahih Bukhari: 1"\n}',
+]
+
+
+def load_recordings(path):
+    """
+    Read recorded exchanges from a JSON Lines file with one
+    {"prompt": ..., "response": ...} object per line.
+    """
+    recordings = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entry = json.loads(line)
+                recordings.append((entry.get("prompt"), entry["response"]))
+    return recordings
+
+
+class FakeBackend(AIBackend):
+    """
+    In-process stand-in that replays recorded responses.
+
+    A prompt seen in the recordings gets its recorded response; any other
+    prompt gets one picked by prompt hash, so results are repeatable. The
+    first chunk arrives after latency_ms +/- jitter_ms, the rest follow in
+    pieces of chunk_chars every chunk_delay_ms, and error_rate of the requests
+    fail with error_message instead.
+    """
+
+    def __init__(self, recordings=None, latency_ms=300, jitter_ms=100, error_rate=0.0,
+                 error_message="503 Service Unavailable (fake backend)", chunk_chars=40,
+                 chunk_delay_ms=20, stream=True, timeout=60, seed=None):
+        recordings = recordings or [(None, response) for response in DEFAULT_RESPONSES]
+        self.by_prompt = {prompt: response for prompt, response in recordings if prompt is not None}
+        self.responses = [response for _, response in recordings]
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.error_message = error_message
+        self.chunk_chars = max(1, chunk_chars)
+        self.chunk_delay = chunk_delay_ms / 1000
+        self.settings = {"model": "fake", "stream": stream, "timeout": timeout}
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Build from the "backend" section of config.json"""
+        path = settings.get("recordings_path")
+        return cls(
+            recordings=load_recordings(path) if path else None,
+            latency_ms=settings["latency_ms"],
+            jitter_ms=settings["jitter_ms"],
+            error_rate=settings["error_rate"],
+            chunk_chars=settings["chunk_chars"],
+            chunk_delay_ms=settings["chunk_delay_ms"],
+        )
+
+    def get_settings(self):
+        return dict(self.settings)
+
+    def response_for(self, prompt):
+        response = self.by_prompt.get(prompt)
+        if response is None:
+            digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+            response = self.responses[int.from_bytes(digest[:4], "big") % len(self.responses)]
+        return response
+
+    def draw(self):
+        """(first chunk delay, fails) for one request"""
+        with self.lock:
+            delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+            fails = self.random.random() < self.error_rate
+        return max(0.0, delay), fails
+
+    def generate(self, prompt, token, system_instruction=None, response_schema=None):
+        return "".join(self.stream(prompt, token, system_instruction, response_schema))
+
+    def stream(self, prompt, token, system_instruction=None, response_schema=None):
+        response = self.response_for(prompt)
+        delay, fails = self.draw()
+        token.sleep(delay)
+        if fails:
+            raise Exception(self.error_message)
+        for i in range(0, len(response), self.chunk_chars):
+            if i:
+                token.sleep(self.chunk_delay)
+            yield response[i:i + self.chunk_chars]
+
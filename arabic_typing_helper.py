@@ -1,14 +1,15 @@
 import sys
-from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QGridLayout,
+from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QStackedWidget,
     QPushButton, QVBoxLayout, QHBoxLayout, QLabel, QTextEdit, QComboBox, QSpinBox, QInputDialog, QMessageBox)
 from PySide6.QtCore import Qt, QEvent, QTimer
-from PySide6.QtGui import QFont, QKeySequence, QShortcut, QTextOption, QTextBlockFormat, QIcon, QGuiApplication
-import qtawesome as qta
+from PySide6.QtGui import QFont, QKeySequence, QShortcut, QTextOption, QTextBlockFormat, QTextCursor, QIcon, QGuiApplication
+from icon_cache import get_icon
 import ctypes
 import os
-from constants import (KEYBOARD_MAPPINGS, PEGON_MAPPING, HARAKAT_MAPPING, 
-                      DEFAULT_FONTS, UI_SETTINGS)
-from ui_components import UIComponentBuilder
+import time
+from constants import DEFAULT_FONTS, UI_SETTINGS
+import transliterator
+from ui_components import UIComponentBuilder, HighlightScheduler
 from settings_manager import SettingsManager
 from gemini_integration import GeminiIntegration
 
@@ -16,14 +17,20 @@ class ArabicTypingHelper(QMainWindow):
     def __init__(self):
         super().__init__()
         self.active_buttons = {}
-        self.original_styles = {}
-        self.active_timers = {}
         self.current_modifiers = set()
         self.current_mode = "Arabic"
+        self.pegon_transliterator = transliterator.get_transliterator("Pegon")
+        self.pegon_state = self.pegon_transliterator.start()
+        self.pegon_state_pos = -1
+        self.right_block_format = QTextBlockFormat()
+        self.right_block_format.setAlignment(Qt.AlignRight)
+        self.aligned_block = None
+        self.last_insert_time = 0.0
         
         # Initialize components
         self.settings_manager = SettingsManager()
         self.ui_builder = UIComponentBuilder(self)
+        self.highlight_scheduler = HighlightScheduler(self)
         self.gemini_integration = GeminiIntegration(self)
         
         self.set_app_icon_and_id()
@@ -82,7 +89,7 @@ class ArabicTypingHelper(QMainWindow):
         self.size_spin.setRange(8, 72)
         self.size_spin.setValue(20)
         
-        reset_btn = QPushButton(qta.icon('fa6s.rotate-right', color='orange'), "Reset")
+        reset_btn = QPushButton(get_icon('fa6s.rotate-right', color='orange'), "Reset")
         reset_btn.setToolTip("Reset font dan ukuran ke default")
         
         settings_row.addWidget(mode_label)
@@ -95,13 +102,13 @@ class ArabicTypingHelper(QMainWindow):
         settings_row.addStretch()
 
         # API and Gemini buttons
-        api_key_btn = QPushButton(qta.icon('fa6s.key', color='gold'), "")
+        api_key_btn = QPushButton(get_icon('fa6s.key', color='gold'), "")
         api_key_btn.setToolTip("Konfigurasi Kunci API Gemini")
         api_key_btn.setMinimumWidth(40)
         api_key_btn.clicked.connect(self.configure_api_key)
         settings_row.addWidget(api_key_btn)
 
-        gemini_btn = QPushButton(qta.icon('fa6s.star', color='deepskyblue'), "")
+        gemini_btn = QPushButton(get_icon('fa6s.star', color='deepskyblue'), "")
         gemini_btn.setToolTip("Gunakan AI Gemini (buat, perbaiki, atau auto-harakat teks Arab)")
         gemini_btn.setMinimumWidth(40)
         gemini_btn.clicked.connect(self.gemini_integration.show_gemini_dialog)
@@ -124,6 +131,9 @@ class ArabicTypingHelper(QMainWindow):
         self.text_area.setAcceptRichText(False)
         self.text_area.setAcceptDrops(True)
         self.text_area.setContextMenuPolicy(Qt.DefaultContextMenu)
+        document = self.text_area.document()
+        document.contentsChange.connect(self.on_contents_change)
+        document.documentLayoutChanged.connect(self.forget_aligned_block)
         
         arabic_font = QFont()
         arabic_font.setFamily("Noto Sans Arabic")
@@ -153,6 +163,9 @@ class ArabicTypingHelper(QMainWindow):
         self.catatan_label.setWordWrap(True)
         self.catatan_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
         main_layout.addWidget(self.catatan_label)
+
+        # Running Gemini requests, each with its own cancel button
+        main_layout.addWidget(self.gemini_integration.create_job_panel())
         
         # Font update functions
         def update_font():
@@ -176,13 +189,12 @@ class ArabicTypingHelper(QMainWindow):
         keyboard_layout = QHBoxLayout()
         left_side = QVBoxLayout()
         
-        self.letters_layout = QGridLayout()
-        self.letters_layout.setSpacing(3)
+        # One cached page per keyboard mode, switched in place
+        self.keyboard_stack = QStackedWidget()
+        self.keyboard_pages = {}
+        self.page_buttons = {}
         self.update_keyboard_layout()
-        
-        self.letters_widget = QWidget()
-        self.letters_widget.setLayout(self.letters_layout)
-        left_side.addWidget(self.letters_widget)
+        left_side.addWidget(self.keyboard_stack)
         
         # Special controls
         special_layout = self.ui_builder.create_special_controls()
@@ -227,7 +239,7 @@ class ArabicTypingHelper(QMainWindow):
         dlg.setWindowTitle("Konfigurasi Kunci API Gemini")
         dlg.setLabelText(f"Kunci API Saat Ini: {masked_key}\n\nMasukkan Kunci API Gemini Baru:")
         dlg.setTextValue(current_key if current_key else "")
-        dlg.setWindowIcon(qta.icon('fa6s.key', color='gold'))
+        dlg.setWindowIcon(get_icon('fa6s.key', color='gold'))
         ok = dlg.exec()
         text = dlg.textValue()
         
@@ -244,6 +256,8 @@ class ArabicTypingHelper(QMainWindow):
             self.current_mode = "Arabic"
         else:
             self.current_mode = new_mode
+        self.pegon_transliterator.reset(self.pegon_state)
+        self.aligned_block = None
         self.update_keyboard_layout()
         
         if new_mode == "ABC":
@@ -269,31 +283,7 @@ class ArabicTypingHelper(QMainWindow):
         )
 
     def update_keyboard_layout(self):
-        self.ui_builder.create_keyboard_layout()
-
-    def get_keyboard_char(self, key):
-        if self.current_mode == "Pegon":
-            return self.get_pegon_mapping(key)
-        mapping = self.get_keyboard_mapping()
-        return mapping.get(key, key)
-
-    def get_keyboard_mapping(self):
-        return KEYBOARD_MAPPINGS.get(self.current_mode, KEYBOARD_MAPPINGS["Arabic"])
-
-    def get_pegon_mapping(self, key, shift=False):
-        modifiers = QApplication.keyboardModifiers()
-        use_shift = shift or (modifiers & Qt.ShiftModifier)
-        if key in PEGON_MAPPING:
-            return PEGON_MAPPING[key][1] if use_shift else PEGON_MAPPING[key][0]
-        return key
-
-    def get_pegon_display(self, key):
-        if key in PEGON_MAPPING:
-            return PEGON_MAPPING[key][0]
-        return key
-
-    def get_harakat_mapping(self):
-        return HARAKAT_MAPPING
+        self.ui_builder.show_keyboard_page(self.current_mode)
 
     def button_clicked(self, character, key):
         self.insert_text(character)
@@ -307,28 +297,11 @@ class ArabicTypingHelper(QMainWindow):
             self.insert_text('\n')
 
     def highlight_button(self, key):
-        if key in self.active_buttons:
-            btn = self.active_buttons[key]
-            if key in self.active_timers:
-                self.active_timers[key].stop()
-                self.active_timers[key].deleteLater()
-                del self.active_timers[key]
-            if key not in self.original_styles or not self.original_styles[key]:
-                self.original_styles[key] = btn.styleSheet()
-            btn.setStyleSheet(f"background-color: {UI_SETTINGS['highlight_color']}; color: white;")
-            
-            def restore_style():
-                if key in self.active_buttons:
-                    btn.setStyleSheet(self.original_styles.get(key, ""))
-                if key in self.active_timers:
-                    self.active_timers[key].deleteLater()
-                    del self.active_timers[key]
-            
-            timer = QTimer(self)
-            timer.timeout.connect(restore_style)
-            timer.setSingleShot(True)
-            timer.start(UI_SETTINGS['highlight_duration'])
-            self.active_timers[key] = timer
+        btn = self.page_buttons.get(key)
+        if btn is None:
+            btn = self.active_buttons.get(key)
+        if btn is not None:
+            self.highlight_scheduler.highlight(btn)
 
     def eventFilter(self, obj, event):
         if obj == self.text_area and event.type() == QEvent.KeyPress:
@@ -359,22 +332,14 @@ class ArabicTypingHelper(QMainWindow):
                 return False
             
             if self.current_mode == "Pegon":
-                char = self.get_pegon_mapping(key, shift=event.modifiers() & Qt.ShiftModifier)
-                self.insert_text(char)
+                self.type_pegon_key(key, shift=event.modifiers() & Qt.ShiftModifier)
                 self.highlight_button(key)
                 return True
             
-            keyboard_mapping = self.get_keyboard_mapping()
-            harakat_mapping = self.get_harakat_mapping()
-            
-            if key in harakat_mapping and self.current_mode != "ABC":
-                self.insert_text(harakat_mapping[key])
-                self.highlight_button(key)
-                return True
-            elif key in keyboard_mapping:
-                self.insert_text(keyboard_mapping[key])
+            char = transliterator.map_key(key, self.current_mode)
+            if char is not None:
+                self.insert_text(char)
                 self.highlight_button(key)
-                return True
             
             return True
         return super().eventFilter(obj, event)
@@ -387,14 +352,50 @@ class ArabicTypingHelper(QMainWindow):
         self.copy_text()
         self.highlight_button("copy")
 
-    def insert_text(self, character):
+    def type_pegon_key(self, key, shift=False):
+        """Feed a key through the Pegon sequence automaton and rewrite the pending text"""
         cursor = self.text_area.textCursor()
-        if self.current_mode != "ABC":
-            block_format = QTextBlockFormat()
-            block_format.setAlignment(Qt.AlignRight)
-            cursor.setBlockFormat(block_format)
+        if cursor.position() != self.pegon_state_pos or cursor.hasSelection():
+            self.pegon_transliterator.reset(self.pegon_state)
+        delete, text = self.pegon_transliterator.feed(self.pegon_state, key.upper() if shift else key)
+        self.insert_text(text, replace=delete)
+        self.pegon_state_pos = self.text_area.textCursor().position()
+
+    def insert_text(self, character, replace=0):
+        cursor = self.text_area.textCursor()
+        if replace:
+            cursor.movePosition(QTextCursor.PreviousCharacter, QTextCursor.KeepAnchor, replace)
+        
+        # Rapid keystrokes share one edit block (one layout pass and one undo step)
+        now = time.monotonic()
+        if now - self.last_insert_time < UI_SETTINGS['keystroke_group_ms'] / 1000:
+            cursor.joinPreviousEditBlock()
+        else:
+            cursor.beginEditBlock()
+        self.last_insert_time = now
+        
+        # Only touch the block format when entering a new block or after a mode switch
+        if self.current_mode != "ABC" and cursor.block() != self.aligned_block:
+            if cursor.blockFormat().alignment() != Qt.AlignRight:
+                cursor.setBlockFormat(self.right_block_format)
+            self.aligned_block = cursor.block()
         cursor.insertText(character)
-        self.text_area.setTextCursor(cursor)
+        cursor.endEditBlock()
+        
+        # The editor's own cursor already follows an insertion at its position
+        if self.text_area.textCursor().position() != cursor.position():
+            self.text_area.setTextCursor(cursor)
+        else:
+            self.text_area.ensureCursorVisible()
+
+    def on_contents_change(self, position, chars_removed, chars_added):
+        # Removed text may take the cached block with it (clear, setPlainText,
+        # an AI result replacing the document, deleting across a line break)
+        if chars_removed:
+            self.aligned_block = None
+
+    def forget_aligned_block(self):
+        self.aligned_block = None
 
     def backspace(self):
         cursor = self.text_area.textCursor()
@@ -411,8 +412,11 @@ class ArabicTypingHelper(QMainWindow):
 
 def main():
     app = QApplication(sys.argv)
+    # Names the per-user cache folder the rendered icons are kept in
+    app.setApplicationName("ArabicTypingHelper")
     window = ArabicTypingHelper()
     window.show()
+    QTimer.singleShot(UI_SETTINGS['gemini_warm_up_delay_ms'], window.gemini_integration.warm_up_in_background)
     sys.exit(app.exec())
 
 if __name__ == "__main__":
@@ -0,0 +1,125 @@
+"""
+AI request pipeline benchmark for Arabic Typing Helper.
+
+Routes every request through FakeBackend instead of the Gemini API, then
+pushes a burst of requests through the real pipeline: job queue, thread
+pool, streaming, JSON parsing and writing the result into the editor.
+Reports throughput and the p50/p95/p99 latency from submit to the parsed
+result landing in the editor. No network access is needed.
+
+    python benchmarks/bench_ai_pipeline.py [--requests 200] [--concurrency 8]
+        [--latency-ms 50] [--jitter-ms 20] [--error-rate 0.02]
+        [--rpm 6000 --error-message "429 quota exceeded"]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--chunk-chars", type=int, default=40)
+    parser.add_argument("--chunk-delay-ms", type=float, default=2)
+    parser.add_argument("--cache", action="store_true",
+                        help="keep the response cache in the pipeline (off by default)")
+    parser.add_argument("--rpm", type=float, default=0,
+                        help="put a rate limiter with this requests-per-minute budget in front (off by default)")
+    parser.add_argument("--error-message", default="503 Service Unavailable (fake backend)",
+                        help="message of failed fake requests; include 429 to exercise backoff")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    import gemini_ai_helper
+    import gemini_integration
+    from ai_backends import FakeBackend
+    from rate_limiter import RateLimiter
+    from prompt_templates import TEXT_SCHEMAS
+    import arabic_typing_helper
+
+    gemini_ai_helper.set_backend(FakeBackend(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        error_message=args.error_message, chunk_chars=args.chunk_chars,
+        chunk_delay_ms=args.chunk_delay_ms, seed=args.seed,
+    ))
+    if not args.cache:
+        gemini_ai_helper.get_response_cache = lambda: None
+    limiter = RateLimiter(rpm=args.rpm, tpm=0, backoff_base=0.05, backoff_max=1.0) if args.rpm else None
+    gemini_ai_helper.get_rate_limiter = lambda: limiter
+    # Errors are counted below instead of opening a dialog per failure
+    gemini_integration.QMessageBox.critical = lambda *a, **k: None
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = arabic_typing_helper.ArabicTypingHelper()
+    window.settings_manager.save_settings = lambda: True
+    integration = window.gemini_integration
+    settings = dict(integration.get_gemini_settings(), max_concurrent_jobs=args.concurrency)
+    integration.get_gemini_settings = lambda: settings
+    queue = integration.job_queue
+    schema = TEXT_SCHEMAS["Auto harakat"]
+
+    submitted = {}
+    latencies = []
+    errors = []
+
+    def done(job_id, _):
+        latencies.append((time.perf_counter() - submitted.pop(job_id)) * 1000)
+
+    def failed(job_id, message):
+        submitted.pop(job_id, None)
+        errors.append(message)
+
+    # Connected after GeminiIntegration's own slots, so parsing is included
+    queue.finished.connect(done)
+    queue.error.connect(failed)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(args.requests):
+            # A whole-document request would cancel the one before it, so
+            # each job writes into its own range at the start of the editor
+            job_id = integration.submit_job("Auto harakat", f"Tambahkan harakat #{i}", schema, "Auto harakat",
+                                            settings)
+            integration.targets[job_id] = gemini_integration.ResultTarget.span(window.text_area, 0, 0)
+            submitted[job_id] = time.perf_counter()
+        while submitted:
+            app.processEvents()
+            time.sleep(0.0005)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{args.requests} requests, concurrency {args.concurrency}, fake latency "
+          f"{args.latency_ms:g}±{args.jitter_ms:g} ms, error rate {args.error_rate:g}")
+    print(f"throughput: {args.requests / elapsed:8.1f} req/s ({elapsed:.2f} s total)")
+    if latencies:
+        print(f"latency:    p50 {statistics.median(latencies):7.1f} ms   "
+              f"p95 {percentile(latencies, 0.95):7.1f} ms   p99 {percentile(latencies, 0.99):7.1f} ms")
+    print(f"completed:  {len(latencies)}   failed: {len(errors)}")
+    window.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
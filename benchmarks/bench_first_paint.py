@@ -0,0 +1,72 @@
+"""
+Time-to-first-paint benchmark for Arabic Typing Helper.
+
+Each run starts a fresh interpreter, imports the application, builds the
+main window and stops the clock on the window's first paint event. The
+median over several cold runs is reported for the whole cold start and
+for the window construction alone, together with the number of widgets
+alive at that point.
+
+    python benchmarks/bench_first_paint.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import time
+start = time.perf_counter()
+import os, sys
+sys.path.insert(0, {root!r})
+from PySide6.QtWidgets import QApplication, QWidget
+from PySide6.QtCore import QObject, QEvent
+import arabic_typing_helper
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            now = time.perf_counter()
+            print(f"{{(now - start) * 1000:.1f}} {{(now - build_start) * 1000:.1f}} "
+                  f"{{len(window.findChildren(QWidget))}}")
+            os._exit(0)
+        return False
+
+app = QApplication(sys.argv)
+build_start = time.perf_counter()
+window = arabic_typing_helper.ArabicTypingHelper()
+window.settings_manager.save_settings = lambda: True
+watcher = FirstPaint()
+window.installEventFilter(watcher)
+window.show()
+app.exec()
+"""
+
+
+def run_once():
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(root=ROOT)],
+        capture_output=True, text=True, env=env, check=True,
+    ).stdout.split()
+    return float(output[0]), float(output[1]), int(output[2])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    results = [run_once() for _ in range(runs)]
+    times = [total for total, _, _ in results]
+    builds = [build for _, build, _ in results]
+    print(f"time to first paint: median {statistics.median(times):.1f} ms "
+          f"(min {min(times):.1f}, max {max(times):.1f}) over {runs} runs")
+    print(f"window construction to first paint: median {statistics.median(builds):.1f} ms, "
+          f"{results[-1][2]} widgets")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Local hadith search benchmark for Arabic Typing Helper.
+
+Loads a synthetic CSV collection the size of the major books together
+(or opens a real store with --store), then times keyword searches that
+match few, many and no hadith. Exits with status 1 when the median time
+of a case exceeds the budget.
+
+    python benchmarks/bench_hadith_search.py [--store data/hadith.sqlite3] [--hadith 40000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hadith_store
+
+BUDGET_MS = 20.0
+REPEATS = 50
+QUERIES = ("niat amal", "الأعمال", "sabar cahaya", "kata1 kata2 kata3", "tidak ada di koleksi")
+
+
+def build_synthetic(directory, count):
+    source = os.path.join(directory, "hadith.csv")
+    words = [f"kata{i}" for i in range(5000)]
+    rng = random.Random(1)
+    with open(source, "w", encoding="utf-8") as f:
+        f.write("kitab,nomor,perawi,arab,terjemahan\n")
+        for number in range(1, count + 1):
+            translation = " ".join(rng.choice(words) for _ in range(40))
+            if number % 1000 == 0:
+                translation += " niat amal sabar cahaya"
+            f.write(f"Sahih Muslim,{number},Abu Hurairah,إِنَّمَا الْأَعْمَالُ بِالنِّيَّاتِ {number},{translation}\n")
+    store = hadith_store.HadithStore(os.path.join(directory, "hadith.sqlite3"))
+    start = time.perf_counter()
+    hadith_store.load_files([source], store)
+    print(f"loaded {store.count()} hadith in {time.perf_counter() - start:.1f} s")
+    return store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--store", help="existing store file (default: build a synthetic one)")
+    parser.add_argument("--hadith", type=int, default=40000, help="size of the synthetic collection")
+    args = parser.parse_args(argv)
+
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        store = hadith_store.HadithStore(args.store) if args.store else build_synthetic(directory, args.hadith)
+        for query in QUERIES:
+            samples = []
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                hits = store.search(query)
+                samples.append((time.perf_counter() - start) * 1000)
+            median = statistics.median(samples)
+            ok = median <= BUDGET_MS
+            failed = failed or not ok
+            print(f"{query!r:<26}{median:>8.2f} ms  {len(hits)} hits  {'OK' if ok else 'OVER BUDGET'}")
+        store.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+JSON extraction benchmark for Arabic Typing Helper.
+
+Times find_json_object() against the regex cascade it replaced on typical,
+large, deeply nested and malformed Gemini responses, and checks that each
+case decodes to the expected object. Exits with status 1 when a result is
+wrong or the extractor exceeds its time budget on a case.
+
+    python benchmarks/bench_json_extract.py
+"""
+
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gemini_response_helper import find_json_object
+
+AYAH = "بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ "
+BUDGET_MS = 25.0
+REPEATS = 20
+
+
+def legacy_extract(response):
+    """The regex cascade extract_json_object_from_response used before"""
+    json_patterns = [
+        r'```json\s*\n(.*?)\n```',
+        r'```\s*\n(\{.*?\})\n```',
+        r'```\s*(\{.*?\})```',
+    ]
+    for pattern in json_patterns:
+        match = re.search(pattern, response, re.DOTALL | re.IGNORECASE)
+        if match:
+            try:
+                return json.loads(match.group(1))
+            except json.JSONDecodeError:
+                continue
+    json_match = re.search(r'\{.*?\}', response, re.DOTALL)
+    if json_match:
+        try:
+            return json.loads(json_match.group(0))
+        except json.JSONDecodeError:
+            pass
+    return None
+
+
+def build_cases():
+    typical = {"result": AYAH.strip(), "penjelasan": "Basmalah.", "catatan": "Cek ke mushaf."}
+    large = {"result": AYAH * 20000, "penjelasan": "Teks panjang.", "catatan": "Hasil AI."}
+    nested = {"result": "x", "detail": {"level": 1}}
+    for level in range(2, 200):
+        nested = {"result": "x", "detail": nested, "level": level}
+    braces = {"result": "{" * 5000 + "}" * 3000, "catatan": "kurung kurawal di dalam string"}
+    return [
+        ("typical, fenced", "```json\n" + json.dumps(typical, ensure_ascii=False, indent=2) + "\n```", typical),
+        ("large (~1 MB)", "Berikut hasilnya:\n" + json.dumps(large, ensure_ascii=False), large),
+        ("nested 200 deep", json.dumps(nested), nested),
+        ("braces in strings", json.dumps(braces), braces),
+        ("stray brace in prose", "Pakai { jika perlu.\n" + json.dumps(typical, ensure_ascii=False), typical),
+        # The regex cascade is quadratic here, so keep the case small enough to finish
+        ("malformed, 10k open braces", "{" * 10_000 + '"result": 1', None),
+        ("truncated stream", '{"result": "' + AYAH * 20000, None),
+    ]
+
+
+def measure(func, text, repeats=REPEATS):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    failed = False
+    print(f"{'case':<30}{'extractor':>12}{'regex cascade':>16}  result")
+    for name, text, expected in build_cases():
+        new_ms, new_result = measure(find_json_object, text)
+        old_ms, old_result = measure(legacy_extract, text, 3)
+        correct = new_result == expected
+        ok = correct and new_ms <= BUDGET_MS
+        failed = failed or not ok
+        old_note = "" if old_result == expected else " (regex cascade wrong)"
+        print(f"{name:<30}{new_ms:>9.3f} ms{old_ms:>13.3f} ms  "
+              f"{'OK' if ok else ('WRONG' if not correct else 'OVER BUDGET')}{old_note}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
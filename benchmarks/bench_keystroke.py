@@ -0,0 +1,73 @@
+"""
+Per-keystroke insertion latency benchmark for Arabic Typing Helper.
+
+Fills the editor with 10k, 100k and 1M characters, then times insert_text()
+for a burst of keystrokes at the end of the document, including the event
+processing that follows each key. Exits with status 1 when the median or
+95th percentile latency exceeds the budget for a document size.
+
+    python benchmarks/bench_keystroke.py
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtWidgets import QApplication
+from PySide6.QtGui import QTextCursor
+
+# Latency budget per document size: (median ms, p95 ms)
+LATENCY_BUDGET_MS = {
+    10_000: (2.0, 4.0),
+    100_000: (2.0, 4.0),
+    1_000_000: (3.0, 6.0),
+}
+KEYSTROKES = 300
+LINE = "بِسْمِ اللّٰهِ الرَّحْمٰنِ الرَّحِيْمِ " * 3 + "\n"
+
+
+def measure(window, app, size):
+    text = (LINE * (size // len(LINE) + 1))[:size]
+    window.text_area.setPlainText(text)
+    cursor = window.text_area.textCursor()
+    cursor.movePosition(QTextCursor.End)
+    window.text_area.setTextCursor(cursor)
+    app.processEvents()
+
+    samples = []
+    for i in range(KEYSTROKES):
+        char = "\n" if i % 60 == 59 else "ب"
+        start = time.perf_counter()
+        window.insert_text(char)
+        app.processEvents()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    import arabic_typing_helper
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = arabic_typing_helper.ArabicTypingHelper()
+    window.settings_manager.save_settings = lambda: True
+    window.show()
+    app.processEvents()
+
+    failed = False
+    for size, (median_budget, p95_budget) in LATENCY_BUDGET_MS.items():
+        median, p95 = measure(window, app, size)
+        ok = median <= median_budget and p95 <= p95_budget
+        failed = failed or not ok
+        print(f"{size:>9} chars: median {median:6.3f} ms (budget {median_budget}), "
+              f"p95 {p95:6.3f} ms (budget {p95_budget}) {'OK' if ok else 'OVER BUDGET'}")
+    window.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
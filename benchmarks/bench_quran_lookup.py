@@ -0,0 +1,106 @@
+"""
+Offline Quran lookup benchmark for Arabic Typing Helper.
+
+Builds a store and a search index from a synthetic Tanzil dump (or opens
+the real ones with --store and --index), then times single-ayat lookups,
+ranges, reference parsing and topic searches. The synthetic verses all
+share their words, so every search term hits all 6236 verses: the worst
+case for the index. Exits with status 1 when the median time of a case
+exceeds its budget.
+
+    python benchmarks/bench_quran_lookup.py [--store data/quran.bin --index data/quran-index.bin]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import quran_search
+import quran_store
+
+# Median budget per case, in microseconds
+BUDGET_US = {
+    "open store": 1000.0,
+    "verse 2:255": 20.0,
+    "lookup '2:255'": 50.0,
+    "lookup '1:1-7'": 100.0,
+    "lookup 'Al-Baqarah 1-286'": 2000.0,
+    "open index": 1000.0,
+    "search (first, decodes terms)": 10000.0,
+    "search 'sabar dan salat'": 10000.0,
+}
+REPEATS = 2000
+VERSE = "اللَّهُ لَا إِلَٰهَ إِلَّا هُوَ الْحَيُّ الْقَيُّومُ لَا تَأْخُذُهُ سِنَةٌ وَلَا نَوْمٌ"
+
+
+TRANSLATION = "Allah, tidak ada tuhan selain Dia, Yang Mahahidup, yang terus-menerus mengurus makhluk-Nya, sabar dan salat"
+
+
+def build_synthetic(directory):
+    """(store path, index path) of a synthetic store and its index"""
+    source = os.path.join(directory, "quran-synthetic.txt")
+    with open(source, "w", encoding="utf-8") as f:
+        for surah, (_, count) in enumerate(quran_store.SURAHS, 1):
+            for ayat in range(1, count + 1):
+                f.write(f"{surah}|{ayat}|{VERSE} {TRANSLATION}\n")
+    path = os.path.join(directory, "quran.bin")
+    quran_store.build_store(source, path)
+    index_path = os.path.join(directory, "quran-index.bin")
+    store = quran_store.VerseStore(path)
+    quran_search.build_index([store], index_path)
+    store.close()
+    return path, index_path
+
+
+def measure(func, repeats=REPEATS):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--store", help="existing store file (default: build a synthetic one)")
+    parser.add_argument("--index", help="existing search index (default: build a synthetic one)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path, index_path = build_synthetic(directory) if not (args.store and args.index) else (None, None)
+        path = args.store or path
+        index_path = args.index or index_path
+        stores = []
+        results = {"open store": measure(lambda: stores.append(quran_store.VerseStore(path)), 50)}
+        store = stores[0]
+        for name, func in {
+            "verse 2:255": lambda: store.verse(2, 255),
+            "lookup '2:255'": lambda: store.lookup("2:255"),
+            "lookup '1:1-7'": lambda: store.lookup("1:1-7"),
+            "lookup 'Al-Baqarah 1-286'": lambda: store.lookup("Al-Baqarah 1-286"),
+        }.items():
+            results[name] = measure(func)
+        indexes = []
+        results["open index"] = measure(lambda: indexes.append(quran_search.QuranSearch(index_path)), 50)
+        search = indexes[0]
+        results["search (first, decodes terms)"] = measure(lambda: search.search("sabar dan salat"), 1)
+        results["search 'sabar dan salat'"] = measure(lambda: search.search("sabar dan salat"), 50)
+        for opened in stores + indexes:
+            opened.close()
+
+    failed = False
+    for name, median in results.items():
+        ok = median <= BUDGET_US[name]
+        failed = failed or not ok
+        print(f"{name:<28}{median:>10.1f} us  (budget {BUDGET_US[name]:g} us)  {'OK' if ok else 'OVER BUDGET'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Import-time budget for Arabic Typing Helper.
+
+Runs `python -X importtime -c "import arabic_typing_helper"` in fresh
+interpreters, reports the cumulative import time and the heaviest
+top-level imports, and exits with status 1 when the best run exceeds the
+budget or when a module that must stay lazy was imported at startup.
+
+    python benchmarks/bench_startup.py [runs]
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_MS = 500
+# Modules that must only be imported on first use, never at startup
+LAZY_MODULES = ("google.generativeai", "grpc", "google.protobuf", "qtawesome")
+TOP_IMPORTS = 8
+
+
+def run_importtime():
+    """Return {module: (self_us, cumulative_us, depth)} for one cold import"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import arabic_typing_helper"],
+        capture_output=True, text=True, cwd=ROOT, check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    samples = [run_importtime() for _ in range(runs)]
+    best = min(samples, key=lambda modules: modules["arabic_typing_helper"][1])
+    total_ms = best["arabic_typing_helper"][1] / 1000
+
+    print(f"import arabic_typing_helper: {total_ms:.1f} ms (budget {IMPORT_BUDGET_MS} ms, best of {runs})")
+    direct = [(name, cumulative) for name, (_, cumulative, depth) in best.items() if depth == 1]
+    for name, cumulative in sorted(direct, key=lambda item: item[1], reverse=True)[:TOP_IMPORTS]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    eager = [name for name in best if name.startswith(LAZY_MODULES)]
+    if eager:
+        failed = True
+        print(f"FAIL: lazy modules imported at startup: {', '.join(sorted(eager)[:5])}")
+    if total_ms > IMPORT_BUDGET_MS:
+        failed = True
+        print("FAIL: import time over budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
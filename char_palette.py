@@ -0,0 +1,109 @@
+"""
+Model-backed character palette for Arabic Typing Helper
+"""
+
+import unicodedata
+from array import array
+from functools import lru_cache
+from PySide6.QtWidgets import QListView, QAbstractItemView
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex, QSize
+from constants import (BASIC_HARAKAT_CHARS, ADVANCED_HARAKAT_CHARS, SYMBOL_CHARS,
+                      ARABIC_PALETTE_RANGES, SYMBOL_CATEGORIES, SYMBOL_MARK_RANGES, UI_SETTINGS)
+
+# Shown under combining marks so they do not render on an empty cell
+DOTTED_CIRCLE = '◌'
+
+
+@lru_cache(maxsize=None)
+def get_char_names():
+    """Indonesian names from the hand-written lists, keyed by character"""
+    names = {}
+    for char, name, _ in BASIC_HARAKAT_CHARS:
+        names.setdefault(char, name)
+    for char, name in ADVANCED_HARAKAT_CHARS + SYMBOL_CHARS:
+        names.setdefault(char, name)
+    return names
+
+
+def is_symbol(code_point):
+    if any(start <= code_point <= end for start, end in SYMBOL_MARK_RANGES):
+        return True
+    return unicodedata.category(chr(code_point)).startswith(SYMBOL_CATEGORIES)
+
+
+@lru_cache(maxsize=None)
+def get_palette_code_points():
+    """Assigned code points of ARABIC_PALETTE_RANGES, split into (characters, symbols)"""
+    characters = array('I')
+    symbols = array('I')
+    for start, end in ARABIC_PALETTE_RANGES:
+        for code_point in range(start, end + 1):
+            if unicodedata.category(chr(code_point)) == 'Cn':
+                continue
+            (symbols if is_symbol(code_point) else characters).append(code_point)
+    return characters, symbols
+
+
+def describe_char(char):
+    """Tooltip text: Indonesian name (if any), Unicode name and code point"""
+    lines = []
+    name = get_char_names().get(char)
+    if name:
+        lines.append(name)
+    lines.append(unicodedata.name(char, ""))
+    lines.append(f"U+{ord(char):04X}")
+    return "\n".join(line for line in lines if line)
+
+
+class CharPaletteModel(QAbstractListModel):
+    """List model over a compact array of code points; cells are computed on demand"""
+
+    def __init__(self, code_points, parent=None):
+        super().__init__(parent)
+        self.code_points = code_points
+
+    def set_code_points(self, code_points):
+        self.beginResetModel()
+        self.code_points = code_points
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.code_points)
+
+    def char_at(self, row):
+        return chr(self.code_points[row])
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        char = self.char_at(index.row())
+        if role == Qt.DisplayRole:
+            if unicodedata.category(char).startswith('M'):
+                return DOTTED_CIRCLE + char
+            return char
+        if role == Qt.ToolTipRole:
+            return describe_char(char)
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        return None
+
+
+class CharPaletteView(QListView):
+    """Grid of palette cells; only the visible cells are laid out and painted"""
+
+    def __init__(self, model, font, on_char_clicked, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        self.setFont(font)
+        self.setViewMode(QListView.IconMode)
+        self.setMovement(QListView.Static)
+        self.setResizeMode(QListView.Adjust)
+        self.setWrapping(True)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.Batched)
+        self.setGridSize(QSize(UI_SETTINGS['palette_cell_width'], UI_SETTINGS['button_min_height']))
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.clicked.connect(lambda index: on_char_clicked(model.char_at(index.row())))
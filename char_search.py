@@ -0,0 +1,92 @@
+"""
+Trigram search over character names for Arabic Typing Helper
+"""
+
+import re
+import unicodedata
+from array import array
+from collections import defaultdict
+from functools import lru_cache
+from char_palette import get_char_names, get_palette_code_points
+
+_CODE_POINT_QUERY = re.compile(r"^(?:u\+|0x|\\u)?([0-9a-f]{4,5})$")
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text):
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def trigrams(text):
+    """Trigrams of every word, padded so one- and two-letter queries still match word starts"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class CharacterIndex:
+    """Precomputed trigram index over Indonesian names, Unicode names and code points"""
+
+    def __init__(self, code_points):
+        names = get_char_names()
+        self.code_points = array('I', code_points)
+        self.positions = {code_point: i for i, code_point in enumerate(self.code_points)}
+        self.texts = []
+        self.named = set()
+        postings = defaultdict(list)
+        for entry, code_point in enumerate(self.code_points):
+            char = chr(code_point)
+            # "ARABIC" prefixes nearly every Unicode name, so it carries no signal
+            unicode_name = unicodedata.name(char, "").replace("ARABIC ", "")
+            text = normalize(f"{names.get(char, '')} {unicode_name} {code_point:04x}")
+            if char in names:
+                self.named.add(entry)
+            self.texts.append(text)
+            for gram in trigrams(text):
+                postings[gram].append(entry)
+        self.postings = {gram: array('H', entries) for gram, entries in postings.items()}
+
+    def search(self, query, limit=50):
+        """Return up to limit code points ranked by trigram overlap with query"""
+        query = query.strip()
+        if not query:
+            return []
+        if len(query) == 1 and ord(query) in self.positions:
+            return [ord(query)]
+
+        exact = _CODE_POINT_QUERY.match(query.lower())
+        if exact and int(exact.group(1), 16) in self.positions:
+            return [int(exact.group(1), 16)]
+
+        text = normalize(query)
+        grams = trigrams(text)
+        if not grams:
+            return []
+        scores = defaultdict(int)
+        for gram in grams:
+            for entry in self.postings.get(gram, ()):
+                scores[entry] += 1
+
+        needed = max(1, len(grams) // 2)
+        ranked = []
+        for entry, shared in scores.items():
+            if shared < needed:
+                continue
+            score = shared / len(grams)
+            if text in self.texts[entry]:
+                score += 1
+            if entry in self.named:
+                # Prefer the curated characters the app already names in Indonesian
+                score += 0.25
+            ranked.append((-score, len(self.texts[entry]), entry))
+        ranked.sort()
+        return [self.code_points[entry] for _, _, entry in ranked[:limit]]
+
+
+@lru_cache(maxsize=None)
+def get_character_index():
+    """Build the search index once, over both palettes"""
+    characters, symbols = get_palette_code_points()
+    return CharacterIndex(sorted(characters.tolist() + symbols.tolist()))
@@ -39,9 +39,8 @@ ADVANCED_HARAKAT_CHARS = [
     ('\u065A', 'Tanda Vokal V Kecil'),
     ('\u065B', 'Tanda Vokal V Kecil Terbalik'),
     ('\u065C', 'Tanda Vokal Titik Bawah'),
-    ('\u065D', 'Dammah Terbalik'),
+    ('\u065D', 'Dammah Cermin'),
     ('\u065E', 'Fathah Dua Titik'),
-    ('\u065F', 'Waslah'),
     ('\u0660', 'Angka Arab-Hindi Nol'),
     ('\u0661', 'Angka Arab-Hindi Satu'),
     ('\u0662', 'Angka Arab-Hindi Dua'),
@@ -146,7 +145,7 @@ ADVANCED_HARAKAT_CHARS = [
     ('\u06C8', 'Yu'),
     ('\u06C9', 'Kirghiz Yu'),
     ('\u06CA', 'Waw dengan Dua Titik'),
-    ('\u06CB', 'Veh'),
+    ('\u06CB', 'Ve'),
     ('\u06CC', 'Farsi Yeh'),
     ('\u06CD', 'Yeh dengan Ekor'),
     ('\u06CE', 'Yeh dengan V Kecil'),
@@ -193,6 +192,23 @@ SYMBOL_CHARS = [
     ('\u06ED', 'Tanda Maqam'),
 ]
 
+# Unicode blocks shown in the Lanjutan and Simbol palettes
+ARABIC_PALETTE_RANGES = [
+    (0x0600, 0x06FF),  # Arabic
+    (0x0750, 0x077F),  # Arabic Supplement
+    (0x08A0, 0x08FF),  # Arabic Extended-A
+    (0xFB50, 0xFDFF),  # Arabic Presentation Forms-A
+]
+
+# Palette characters that go to the Simbol tab: punctuation, symbols,
+# format characters and the Quranic annotation marks
+SYMBOL_CATEGORIES = ('P', 'S', 'Cf')
+SYMBOL_MARK_RANGES = [
+    (0x0610, 0x061A),
+    (0x06D6, 0x06ED),
+    (0x08D3, 0x08E1),
+]
+
 # Keyboard mappings
 KEYBOARD_MAPPINGS = {
     "ABC": {
@@ -223,6 +239,11 @@ PEGON_MAPPING = {
     'n': ('ن', 'ں'), 'm': ('م', 'م')
 }
 
+# Pegon multi-key sequences, matched by longest match before the single-key mapping
+PEGON_SEQUENCES = {
+    'ng': 'ڠ', 'ny': 'ۑ', 'dh': 'ڎ', 'th': 'ڟ'
+}
+
 # Harakat keyboard shortcuts
 HARAKAT_MAPPING = {
     '1': 'َ', '2': 'ِ', '3': 'ُ', '4': 'ْ', '5': 'ّ',
@@ -248,11 +269,44 @@ UI_SETTINGS = {
     'min_size': (800, 400),
     'button_min_height': 60,
     'button_min_width': 80,
+    'palette_cell_width': 64,
     'harakat_font_size': 28,
     'keyboard_font_size': 16,
     'text_area_font_size': 20,
     'instruction_font_size': 14,
     'button_font_size': 14,
     'highlight_color': '#007ACC',
-    'highlight_duration': 150
+    'highlight_alpha': 150,
+    'highlight_duration': 150,
+    'highlight_tick_ms': 30,
+    'keystroke_group_ms': 500,
+    'gemini_warm_up_delay_ms': 1000
 }
+
+# Gemini job priorities: when more jobs are waiting than the pool runs at once,
+# higher values start first, so quick checks are not stuck behind long searches
+GEMINI_JOB_PRIORITIES = {
+    "Cek kesalahan": 3,
+    "Perbaiki (ejaan/harakat)": 2,
+    "Auto harakat": 2,
+    "Tulis ulang dalam Arab": 2,
+    "Prompt bebas": 1,
+    "Cari ayat": 0,
+    "Cari hadith": 0
+}
+
+# Actions whose result maps one-to-one onto the input text; long documents are
+# split into chunks that are sent in parallel and written back in place
+GEMINI_CHUNKED_ACTIONS = ("Auto harakat", "Perbaiki (ejaan/harakat)")
+
+# Offline topic search for "Cari ayat": verses shown directly, and candidates
+# handed to Gemini when it is asked to choose among them
+QURAN_SEARCH_RESULTS = 5
+QURAN_SEARCH_CANDIDATES = 10
+
+# Most verses of a local "Cari ayat" result sent to Gemini for explanation;
+# a longer range (a whole surah) is explained from its citation alone
+QURAN_EXPLAIN_MAX_VERSES = 20
+
+# Matches of the local hadith collection shown for "Cari hadith"
+HADITH_SEARCH_RESULTS = 5
@@ -0,0 +1,87 @@
+"""
+Split long documents into independent chunks for Gemini requests
+"""
+
+import re
+
+# A paragraph with its trailing newlines
+_PARAGRAPH = re.compile(r'[^\n]+\n*|\n+')
+# A sentence with its closing punctuation and trailing spaces, or a tail without one
+_SENTENCE = re.compile(r'[^.!?؟۔]*[.!?؟۔]+[^\S\n]*|[^.!?؟۔]+')
+
+# Output tokens per character of a chunk: the text comes back with a mark on
+# most letters, and Arabic takes more tokens per character than Latin text
+OUTPUT_TOKENS_PER_CHAR = 1.5
+# Share of max_tokens a chunk's result may use; the rest is left for the
+# model's thinking and the catatan and penjelasan fields
+RESULT_SHARE = 0.5
+
+
+def _cut_at_spaces(text, max_chars):
+    """Hard-cut an over-long sentence, at a space where there is one"""
+    while len(text) > max_chars:
+        cut = text.rfind(' ', 0, max_chars) + 1 or max_chars
+        yield text[:cut]
+        text = text[cut:]
+    if text:
+        yield text
+
+
+def _pieces(text, max_chars):
+    """Paragraphs, falling back to sentences and then words for long ones"""
+    for paragraph in _PARAGRAPH.findall(text):
+        if len(paragraph) <= max_chars:
+            yield paragraph
+            continue
+        for sentence in _SENTENCE.findall(paragraph):
+            yield from _cut_at_spaces(sentence, max_chars)
+
+
+def split_document(text, max_chars):
+    """
+    Split text into chunks of at most max_chars, cutting at paragraph and
+    sentence boundaries. Returns (start, end) spans of each chunk with the
+    surrounding whitespace left out; whitespace-only chunks are dropped, so
+    the text between spans is never sent and stays exactly as it was.
+    """
+    spans = []
+    chunk_start = 0
+    pos = 0
+    for piece in _pieces(text, max_chars):
+        if pos > chunk_start and pos + len(piece) - chunk_start > max_chars:
+            spans.append((chunk_start, pos))
+            chunk_start = pos
+        pos += len(piece)
+    spans.append((chunk_start, pos))
+
+    trimmed = []
+    for start, end in spans:
+        chunk = text[start:end]
+        body = chunk.strip()
+        if body:
+            start += len(chunk) - len(chunk.lstrip())
+            trimmed.append((start, start + len(body)))
+    return trimmed
+
+
+def utf16_spans(text, spans):
+    """
+    The same spans counted in UTF-16 units, as QTextCursor positions are;
+    characters outside the BMP (emoji, some symbols) take two units each
+    """
+    converted = []
+    pos = 0
+    units = 0
+    for start, end in spans:
+        units += len(text[pos:start].encode('utf-16-le')) // 2
+        length = len(text[start:end].encode('utf-16-le')) // 2
+        converted.append((units, units + length))
+        units += length
+        pos = end
+    return converted
+
+
+def chunk_limit(chunk_chars, max_tokens):
+    """chunk_chars, lowered where needed so a chunk's result fits in max_tokens"""
+    fitting = int(max_tokens * RESULT_SHARE / OUTPUT_TOKENS_PER_CHAR)
+    return max(1, min(chunk_chars, fitting))
@@ -1,48 +1,420 @@
-import google.generativeai as genai
-import os
 import json
+import os
+import threading
+import time
+from ai_backends import AIBackend, FakeBackend
+from gemini_cache import ResponseCache
+from rate_limiter import RateLimiter, estimate_tokens
+from settings_manager import SettingsManager
+
+_backend = None
+_backend_lock = threading.Lock()
+_client = None
+_client_lock = threading.Lock()
+_response_cache = None
+_response_cache_lock = threading.Lock()
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+# Stands in for a cache or limiter that config.json turns off, so the
+# settings are read once either way
+_DISABLED = object()
+
+def load_genai():
+    """Import the Gemini SDK on first use; it pulls in the whole gRPC/protobuf stack."""
+    import google.generativeai as genai
+    return genai
+
+def warm_up():
+    """Import the SDK ahead of the first request (meant for a background thread)."""
+    try:
+        load_genai()
+    except Exception:
+        pass
+
+class RequestCancelled(Exception):
+    """Raised inside a request once its CancelToken is cancelled or past its deadline"""
+
+class ResponseTruncated(Exception):
+    """Raised when the model stopped at max_tokens, leaving the response cut short"""
+
+class CancelToken:
+    """
+    Cooperative cancellation for one request. The worker checks the token
+    between stream chunks; cancel() also cancels a streamed call, so a read
+    blocked on the first or a later chunk returns early. The deadline comes
+    from the "timeout" setting.
+    """
+
+    def __init__(self, timeout=None):
+        self.event = threading.Event()
+        self.set_deadline(timeout)
+        self.callbacks = []
+        self.lock = threading.Lock()
+
+    def set_deadline(self, timeout):
+        """Start the deadline now (None or 0 for no deadline)"""
+        self.deadline = time.monotonic() + timeout if timeout else None
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def remaining(self):
+        """Seconds left before the deadline, or None without one"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def cancel(self):
+        with self.lock:
+            if self.event.is_set():
+                return
+            self.event.set()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def on_cancel(self, callback):
+        """Run callback when the token is cancelled (immediately if it already is)"""
+        with self.lock:
+            if not self.event.is_set():
+                self.callbacks.append(callback)
+                return
+        callback()
+
+    def sleep(self, seconds):
+        """Sleep, waking early and raising once the token is cancelled or expires"""
+        end = time.monotonic() + seconds
+        while True:
+            self.check()
+            left = end - time.monotonic()
+            if left <= 0:
+                return
+            remaining = self.remaining()
+            if remaining is not None:
+                # Wake just past the deadline so check() reports the timeout
+                left = min(left, remaining + 0.001)
+            self.event.wait(left)
+
+    def check(self):
+        if self.cancelled:
+            raise RequestCancelled("Permintaan dibatalkan")
+        if self.expired():
+            raise RequestCancelled("Batas waktu permintaan habis")
+
+class GeminiClient:
+    """
+    Process-wide Gemini models built from SettingsManager, one per system
+    instruction. The models (and the SDK transport behind them) are reused
+    across requests and only rebuilt when the gemini section of config.json
+    or GEMINI_API_KEY changes.
+    """
+
+    # Settings that change the model itself; the rest are read per request
+    MODEL_SETTINGS = ("api_key", "model", "temperature", "max_tokens")
+
+    def __init__(self, settings_manager=None):
+        self.settings_manager = settings_manager or SettingsManager()
+        self.lock = threading.Lock()
+        self.fingerprint = None
+        self.models = {}
+        self.settings = None
+
+    def get_model(self, system_instruction=None):
+        """Return (model, settings), rebuilding the models if the settings changed"""
+        with self.lock:
+            self.settings_manager.reload_if_changed()
+            settings = self.settings_manager.get_gemini_settings()
+            fingerprint = tuple(settings[name] for name in self.MODEL_SETTINGS)
+            if fingerprint != self.fingerprint:
+                if not settings["api_key"]:
+                    raise ValueError("GEMINI_API_KEY not found. Please set it in environment variable or config.json")
+                load_genai().configure(api_key=settings["api_key"])
+                self.models = {}
+                self.fingerprint = fingerprint
+            self.settings = settings
+            model = self.models.get(system_instruction)
+            if model is None:
+                genai = load_genai()
+                model = self.models[system_instruction] = genai.GenerativeModel(
+                    settings["model"],
+                    generation_config=genai.GenerationConfig(
+                        temperature=settings["temperature"],
+                        max_output_tokens=settings["max_tokens"],
+                    ),
+                    system_instruction=system_instruction,
+                )
+            return model, self.settings
+
+def get_client():
+    """Shared GeminiClient for the whole process"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GeminiClient()
+        return _client
 
 def configure_gemini_api():
     """Configure the Gemini API with your API key."""
-    # Try environment variable first
-    api_key = os.getenv("GEMINI_API_KEY")
-    
-    # If not found, try config file
-    if not api_key:
+    get_client().get_model()
+
+def get_response_cache():
+    """Shared response cache, or None when disabled in config.json"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            settings = get_client().settings_manager.get_cache_settings()
+            if not settings["enabled"]:
+                _response_cache = _DISABLED
+            else:
+                _response_cache = ResponseCache(
+                    ttl_seconds=settings["ttl_hours"] * 3600,
+                    max_disk_bytes=int(settings["max_disk_mb"] * 1024 * 1024),
+                    memory_entries=settings["memory_entries"],
+                )
+        return None if _response_cache is _DISABLED else _response_cache
+
+def get_rate_limiter():
+    """Shared rate limiter, or None when disabled in config.json"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            settings = get_client().settings_manager.get_rate_limit_settings()
+            if not settings["enabled"]:
+                _rate_limiter = _DISABLED
+            else:
+                _rate_limiter = RateLimiter(
+                    rpm=settings["rpm"],
+                    tpm=settings["tpm"],
+                    backoff_base=settings["backoff_base_s"],
+                    backoff_max=settings["backoff_max_s"],
+                    max_retries=settings["max_retries"],
+                )
+        return None if _rate_limiter is _DISABLED else _rate_limiter
+
+class GeminiBackend(AIBackend):
+    """The Gemini API through the shared GeminiClient"""
+
+    def get_settings(self):
+        return get_client().get_model()[1]
+
+    def generate(self, prompt, token, system_instruction=None, response_schema=None):
+        model, settings = get_client().get_model(system_instruction)
+        try:
+            # Generate content
+            response = model.generate_content(prompt, generation_config=_generation_config(response_schema),
+                                              request_options=_request_options(token))
+            
+            _check_finished(response, settings)
+            # Extract text from response
+            if hasattr(response, 'text'):
+                return response.text
+            elif hasattr(response, 'parts') and response.parts:
+                return response.parts[0].text
+            else:
+                return str(response)
+                
+        except ResponseTruncated:
+            raise
+        except Exception as e:
+            token.check()
+            raise Exception(f"Gemini API error: {str(e)}")
+
+    def stream(self, prompt, token, system_instruction=None, response_schema=None):
+        model, settings = get_client().get_model(system_instruction)
+        stream = None
         try:
-            config_path = os.path.join(os.path.dirname(__file__), "config.json")
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-                api_key = config.get("gemini", {}).get("api_key")
-        except:
-            pass
+            stream = _open_stream(model, prompt, _generation_config(response_schema), _request_options(token))
+            token.on_cancel(lambda: _close_stream(stream))
+            # Blocks until the first chunk; a cancel meanwhile ends the wait with an error
+            response = load_genai().types.GenerateContentResponse.from_iterator(stream)
+            chunk = None
+            for chunk in response:
+                token.check()
+                text = _response_text(chunk)
+                if text:
+                    yield text
+            # The finish reason arrives with the last chunk
+            _check_finished(chunk, settings)
+        except (RequestCancelled, ResponseTruncated):
+            raise
+        except Exception as e:
+            token.check()
+            raise Exception(f"Gemini API error: {str(e)}")
+        finally:
+            _close_stream(stream)
+
+def get_backend():
+    """
+    The AI backend every request goes through: "gemini" unless the backend
+    section of config.json or the AI_BACKEND environment variable says "fake"
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            settings = SettingsManager().get_backend_settings()
+            name = os.getenv("AI_BACKEND") or settings["name"]
+            if name == "fake":
+                _backend = FakeBackend.from_settings(settings)
+            elif name == "gemini":
+                _backend = GeminiBackend()
+            else:
+                raise ValueError(f"Unknown AI backend: {name}")
+        return _backend
+
+def set_backend(backend):
+    """Route all requests through backend (None restores the configured one)"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+def request_gemini(prompt, use_cache=True, token=None, system_instruction=None, response_schema=None):
+    """
+    Send a prompt to the AI backend and return the response text, a JSON
+    object of the given shape when response_schema is set.
+    Identical prompts are answered from the response cache, and identical
+    requests already in flight share one network call.
+    """
+    backend = get_backend()
+    settings = backend.get_settings()
+    if token is None:
+        token = CancelToken(settings["timeout"])
+    token.check()
+    limiter = get_rate_limiter()
     
-    # If still not found, ask user to set it
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY not found. Please set it in environment variable or config.json")
+    def send():
+        return backend.generate(prompt, token, system_instruction, response_schema)
     
-    genai.configure(api_key=api_key)
+    def compute():
+        if limiter is None:
+            return send()
+        return limiter.call(count_input_tokens(prompt, system_instruction), send, token)
+    
+    cache = get_response_cache() if use_cache else None
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(settings["model"], _cache_prompt(prompt, system_instruction, response_schema),
+                                compute, token)
 
-def request_gemini(prompt):
+def stream_gemini(prompt, use_cache=True, token=None, system_instruction=None, response_schema=None):
     """
-    Send a prompt to Gemini and return the plain text response.
+    Yield the response text chunk by chunk as the backend streams it.
+    A cached response, or one an identical request in flight was already
+    streaming, is yielded as a single chunk; with "stream": false in
+    config.json the whole response arrives as one chunk as well.
+    Raises RequestCancelled once token is cancelled or its deadline passes.
     """
+    backend = get_backend()
+    settings = backend.get_settings()
+    if token is None:
+        token = CancelToken(settings["timeout"])
+    if not settings["stream"]:
+        yield request_gemini(prompt, use_cache, token, system_instruction, response_schema)
+        return
+    
+    token.check()
+    limiter = get_rate_limiter()
+    
+    def send():
+        return backend.stream(prompt, token, system_instruction, response_schema)
+    
+    def open_stream():
+        if limiter is None:
+            yield from send()
+        else:
+            yield from limiter.stream(count_input_tokens(prompt, system_instruction), send, token)
+        token.check()
+    
+    cache = get_response_cache() if use_cache else None
+    if cache is None:
+        yield from open_stream()
+        return
+    yield from cache.stream_or_compute(settings["model"], _cache_prompt(prompt, system_instruction, response_schema),
+                                       open_stream, token)
+
+def count_input_tokens(prompt, system_instruction=None):
+    """Estimated input tokens of a request, system instruction included"""
+    tokens = estimate_tokens(prompt)
+    if system_instruction:
+        tokens += estimate_tokens(system_instruction)
+    return tokens
+
+def _cache_prompt(prompt, system_instruction, response_schema=None):
+    # The same prompt under another system instruction or schema is a different request
+    if response_schema:
+        prompt = f"{json.dumps(response_schema, sort_keys=True)}\0{prompt}"
+    if not system_instruction:
+        return prompt
+    return f"{system_instruction}\0{prompt}"
+
+def _generation_config(response_schema):
+    # Merged by the SDK into the model's own generation config
+    if not response_schema:
+        return None
+    return {"response_mime_type": "application/json", "response_schema": response_schema}
+
+def _request_options(token):
+    # The SDK turns this into a transport deadline covering the whole call
+    remaining = token.remaining()
+    return {"timeout": remaining} if remaining is not None else {}
+
+def _open_stream(model, prompt, generation_config, request_options):
+    """
+    Start a streamed generate_content call and return its response stream
+    without waiting for the first chunk. model.generate_content(stream=True)
+    only returns after that chunk, which leaves nothing to close while the
+    model is still thinking, so its stream branch is repeated here.
+    """
+    from google.generativeai import client
+    request = model._prepare_request(contents=prompt, generation_config=generation_config,
+                                     safety_settings=None, tools=None, tool_config=None)
+    if request.contents and not request.contents[-1].role:
+        request.contents[-1].role = "user"
+    if model._client is None:
+        model._client = client.get_default_generative_client()
     try:
-        configure_gemini_api()
-        
-        # Create the model
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        # Generate content
-        response = model.generate_content(prompt)
-        
-        # Extract text from response
-        if hasattr(response, 'text'):
-            return response.text
-        elif hasattr(response, 'parts') and response.parts:
+        # google-api-core's switch for streams that must not prefetch their
+        # first response (google-cloud-pubsub sets it the same way)
+        model._client._transport.stream_generate_content._prefetch_first_result_ = False
+    except AttributeError:
+        pass
+    return model._client.stream_generate_content(request, **request_options)
+
+def _close_stream(stream):
+    """Cancel a streamed call, also while it waits for its first chunk; safe to call more than once"""
+    for name in ("cancel", "close"):
+        method = getattr(stream, name, None)
+        if callable(method):
+            try:
+                method()
+            except Exception:
+                pass
+            return
+
+def _check_finished(response, settings):
+    """Raise ResponseTruncated if the response ended at the output token limit"""
+    candidates = getattr(response, "candidates", None)
+    if not candidates:
+        return
+    reason = candidates[0].finish_reason
+    if getattr(reason, "name", None) == "MAX_TOKENS":
+        # Gemini 2.5 models count their thinking tokens against the limit too
+        raise ResponseTruncated(
+            f"Jawaban terpotong karena mencapai batas max_tokens ({settings['max_tokens']}). "
+            "Naikkan max_tokens di config.json atau kirim teks yang lebih pendek."
+        )
+
+def _response_text(response):
+    # .text raises when a (streamed) response carries no text parts
+    try:
+        return response.text
+    except Exception:
+        if hasattr(response, 'parts') and response.parts:
             return response.parts[0].text
-        else:
-            return str(response)
-            
-    except Exception as e:
-        raise Exception(f"Gemini API error: {str(e)}")
\ No newline at end of file
+        return ""
@@ -0,0 +1,222 @@
+"""
+Two-tier response cache for Gemini requests
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from settings_manager import get_user_cache_dir
+
+CACHE_FILE_NAME = "gemini_responses.sqlite3"
+
+
+def _stopped(token):
+    # The owner's own cancel or deadline says nothing about the request itself
+    return token is not None and (token.cancelled or token.expired())
+
+
+class _InFlight:
+    """Result slot shared by identical requests while the first one is running"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def wait(self, token=None):
+        if token is None:
+            self.done.wait()
+        else:
+            # Poll so a cancelled waiter can leave without the owner finishing
+            while not self.done.wait(0.1):
+                token.check()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class ResponseCache:
+    """In-memory LRU in front of an SQLite store, keyed by model name and prompt hash"""
+
+    def __init__(self, path=None, ttl_seconds=7 * 24 * 3600,
+                 max_disk_bytes=50 * 1024 * 1024, memory_entries=128):
+        # Responses hold the user's text, so they stay in the per-user cache folder
+        self.path = path or os.path.join(get_user_cache_dir(), CACHE_FILE_NAME)
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.db_lock = threading.Lock()
+        self._conn = None
+
+    @staticmethod
+    def make_key(model, prompt):
+        return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, created REAL, accessed REAL,"
+                " size INTEGER, value TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        """Return a fresh cached value or None"""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created < self.ttl_seconds:
+                    self.memory.move_to_end(key)
+                    return value
+                del self.memory[key]
+
+        try:
+            with self.db_lock:
+                conn = self.connection()
+                row = conn.execute("SELECT created, value FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                created, value = row
+                if now - created >= self.ttl_seconds:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.commit()
+                    return None
+                conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                conn.commit()
+        except sqlite3.Error:
+            return None
+        self._remember(key, created, value)
+        return value
+
+    def put(self, key, model, value):
+        now = time.time()
+        self._remember(key, now, value)
+        try:
+            with self.db_lock:
+                conn = self.connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, created, accessed, size, value)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, now, now, len(value.encode("utf-8")), value),
+                )
+                self._evict(conn, now)
+                conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def _remember(self, key, created, value):
+        with self.lock:
+            self.memory[key] = (created, value)
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+
+    def _evict(self, conn, now):
+        """Drop expired rows, then least recently used rows until under the size budget"""
+        conn.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
+
+    def _claim(self, key):
+        """(slot, owner): the in-flight slot for key, and whether this caller must fill it"""
+        with self.lock:
+            pending = self.inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self.inflight[key] = _InFlight()
+        return pending, owner
+
+    def _release(self, key, pending):
+        with self.lock:
+            del self.inflight[key]
+        pending.done.set()
+
+    def get_or_compute(self, model, prompt, compute, token=None):
+        """
+        Return the cached response, or run compute() once for all identical
+        concurrent callers. A caller waiting on someone else's request stops
+        waiting once its own token is cancelled, and takes the request over
+        when the owner's token is cancelled instead.
+        """
+        key = self.make_key(model, prompt)
+        while True:
+            value = self.get(key)
+            if value is not None:
+                return value
+            pending, owner = self._claim(key)
+            if owner:
+                break
+            value = pending.wait(token)
+            if value is not None:
+                return value
+            # The owner was cancelled; ask again, this time as owner
+
+        try:
+            value = compute()
+            self.put(key, model, value)
+            pending.value = value
+            return value
+        except Exception as e:
+            if not _stopped(token):
+                pending.error = e
+            raise
+        finally:
+            self._release(key, pending)
+
+    def stream_or_compute(self, model, prompt, open_stream, token=None):
+        """
+        Yield the response as open_stream() streams it, sharing the request
+        with identical concurrent callers like get_or_compute(). A cached
+        response, or one another caller was already streaming, is yielded as
+        a single chunk once complete.
+        """
+        key = self.make_key(model, prompt)
+        while True:
+            value = self.get(key)
+            if value is not None:
+                yield value
+                return
+            pending, owner = self._claim(key)
+            if owner:
+                break
+            value = pending.wait(token)
+            if value is not None:
+                yield value
+                return
+            # The owner was cancelled or its reader stopped early; ask again, this time as owner
+
+        try:
+            chunks = []
+            for text in open_stream():
+                chunks.append(text)
+                yield text
+            value = "".join(chunks)
+            self.put(key, model, value)
+            pending.value = value
+        except Exception as e:
+            if not _stopped(token):
+                pending.error = e
+            raise
+        finally:
+            self._release(key, pending)
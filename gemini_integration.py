@@ -2,53 +2,165 @@
 Gemini AI Integration for Arabic Typing Helper
 """
 
-from PySide6.QtWidgets import QInputDialog, QMessageBox, QProgressDialog
-from PySide6.QtCore import Qt, QThread, Signal
-from PySide6.QtGui import QIcon
-import qtawesome as qta
-from gemini_ai_helper import request_gemini
-from gemini_response_helper import parse_gemini_response
-
-import json
-import re
+from PySide6.QtWidgets import QInputDialog, QMessageBox, QApplication
+from PySide6.QtGui import QIcon, QTextCursor
+from icon_cache import get_icon
+from gemini_ai_helper import warm_up, count_input_tokens
+from gemini_jobs import GeminiJobQueue, GeminiJobPanel
+from gemini_response_helper import decode_structured_response, extract_partial_json_string
+from document_chunks import split_document, utf16_spans, chunk_limit
+from prompt_templates import (SYSTEM_INSTRUCTION, TEXT_PROMPTS, TEXT_SCHEMAS, CUSTOM_SCHEMA, HADITH_SCHEMA,
+                              text_prompt, custom_prompt, ayat_prompt, ayat_explain_prompt, ayat_schema,
+                              ayat_select_prompt, ayat_select_schema, hadith_prompt)
+from quran_store import (TRANSLATION_PATH, get_quran_store, find_surah, format_reference, format_verses,
+                         format_translation)
+from quran_search import get_quran_search
+from hadith_store import get_hadith_store
+from constants import (GEMINI_JOB_PRIORITIES, GEMINI_CHUNKED_ACTIONS, QURAN_SEARCH_RESULTS,
+                       QURAN_SEARCH_CANDIDATES, QURAN_EXPLAIN_MAX_VERSES, HADITH_SEARCH_RESULTS)
 
-class GeminiWorker(QThread):
-    finished = Signal(str)
-    error = Signal(str)
-    
-    def __init__(self, prompt):
-        super().__init__()
-        self.prompt = prompt
-    
-    def run(self):
-        try:
-            response = request_gemini(self.prompt)
-            self.finished.emit(response)
-        except Exception as e:
-            self.error.emit(str(e))
+import re
+import sqlite3
+import threading
+
+class ResultTarget:
+    """
+    The editor range a job writes its result into. The range is tracked with
+    QTextCursor positions, so edits elsewhere while the job runs move it along.
+    """
+
+    def __init__(self, text_area, cursor, separate=False):
+        self.text_area = text_area
+        self.cursor = cursor
+        self.original = cursor.selection().toPlainText()
+        self.text = None
+        # A result that adds text is set off from what precedes it by a blank line
+        self.separate = separate
+        self.prefix = ""
+        self._keep_clear_of_insertions()
+
+    @classmethod
+    def span(cls, text_area, start, end):
+        cursor = QTextCursor(text_area.document())
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        return cls(text_area, cursor)
+
+    @classmethod
+    def new_block(cls, text_area):
+        """An empty range at the end of the paragraph holding the editor's cursor"""
+        cursor = QTextCursor(text_area.document())
+        cursor.setPosition(text_area.textCursor().selectionEnd())
+        cursor.movePosition(QTextCursor.EndOfBlock)
+        return cls(text_area, cursor, separate=True)
+
+    @classmethod
+    def after(cls, target):
+        """An empty range right after target, for text that follows its result"""
+        cursor = QTextCursor(target.cursor)
+        cursor.setPosition(cursor.selectionEnd())
+        return cls(target.text_area, cursor, separate=True)
+
+    def overlaps(self, other):
+        """Whether writing into one range would write over part of the other"""
+        start, end = self.cursor.selectionStart(), self.cursor.selectionEnd()
+        other_start, other_end = other.cursor.selectionStart(), other.cursor.selectionEnd()
+        if start == end:
+            return other_start < start < other_end
+        if other_start == other_end:
+            return start < other_start < end
+        return max(start, other_start) < min(end, other_end)
+
+    def replace(self, text):
+        """Replace the range with text; repeated replacements form one undo step"""
+        if text == self.text:
+            return
+        if self.text is None and self.separate:
+            # Decided at the first write, after any result written ahead of this one
+            start = self.cursor.selectionStart()
+            document = self.text_area.document()
+            self.prefix = "\n\n" if start and document.characterAt(start - 1) != "\u2029" else ""
+        self._write(self.prefix + text if text else text)
+        self.text = text
+
+    def restore(self):
+        """Put back the text the range held before the job wrote into it"""
+        if self.text is not None:
+            self._write(self.original)
+            self.text = self.original
+
+    def _write(self, text):
+        cursor = self.cursor
+        if self.text is None:
+            cursor.beginEditBlock()
+        else:
+            cursor.joinPreviousEditBlock()
+        start = cursor.selectionStart()
+        cursor.setKeepPositionOnInsert(False)
+        cursor.insertText(text)
+        # Positions count UTF-16 units, so read the end back rather than use len(text)
+        end = cursor.position()
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        cursor.endEditBlock()
+        self._keep_clear_of_insertions()
+
+    def _keep_clear_of_insertions(self):
+        """
+        Leave text inserted right after the range outside it, whether typed
+        or another job's result. An empty range instead moves past text
+        inserted at its spot, since it cannot keep both of its ends in place.
+        """
+        self.cursor.setKeepPositionOnInsert(self.cursor.hasSelection())
+
+class DocumentChunk:
+    """One chunk of a document request, resubmitted on its own if it fails"""
+
+    def __init__(self, batch, index, text, target):
+        self.batch = batch
+        self.index = index
+        self.text = text
+        self.target = target
+        self.attempts = 0
+
+class DocumentBatch:
+    """Progress of a chunked request over a whole document"""
+
+    def __init__(self, choice, total):
+        self.choice = choice
+        self.total = total
+        self.pending = total
+        self.failed = []
+        self.catatan = ""
 
 class GeminiIntegration:
     def __init__(self, parent):
         self.parent = parent
-        self.worker = None
-        self.progress_dialog = None
-
-    def create_progress_dialog(self, title, message):
-        progress = QProgressDialog(message, "Batal", 0, 0, self.parent)
-        progress.setWindowTitle(title)
-        progress.setWindowModality(Qt.WindowModal)
-        progress.setAutoClose(True)
-        progress.setAutoReset(True)
-        progress.setMinimumDuration(0)
-        progress.setWindowIcon(qta.icon('fa6s.star', color='deepskyblue'))
-        progress.show()
-        return progress
+        self.targets = {}
+        self.chunks = {}
+        self.selections = {}
+        self.job_queue = GeminiJobQueue(self.get_gemini_settings()["max_concurrent_jobs"], parent)
+        self.job_queue.partial.connect(self.on_gemini_partial)
+        self.job_queue.finished.connect(self.on_gemini_finished)
+        self.job_queue.error.connect(self.on_gemini_error)
+        self.job_queue.cancelled.connect(self.on_job_cancelled)
+        self.job_panel = None
+        app = QApplication.instance()
+        if app is not None:
+            # Close open streams so pool threads do not hold up exit
+            app.aboutToQuit.connect(self.job_queue.cancel_all)
+
+    def create_job_panel(self):
+        """Progress entries for running jobs, shown under the editor"""
+        self.job_panel = GeminiJobPanel(self.job_queue, self.parent)
+        return self.job_panel
+
+    def warm_up_in_background(self):
+        """Import the Gemini SDK on a background thread when an API key is configured"""
+        if self.parent.settings_manager.get_api_key():
+            threading.Thread(target=warm_up, name="gemini-warm-up", daemon=True).start()
 
     def show_gemini_dialog(self):
-        if self.worker and self.worker.isRunning():
-            QMessageBox.warning(self.parent, "Gemini Sibuk", "Gemini sedang memproses. Mohon tunggu.")
-            return
-        
         options = [
             "Tulis ulang dalam Arab",
             "Perbaiki (ejaan/harakat)",
@@ -63,7 +175,7 @@ class GeminiIntegration:
         dlg.setWindowTitle("AI Gemini")
         dlg.setLabelText("Pilih aksi:")
         dlg.setComboBoxItems(options)
-        dlg.setWindowIcon(qta.icon('fa6s.star', color='deepskyblue'))
+        dlg.setWindowIcon(get_icon('fa6s.star', color='deepskyblue'))
         dlg.setComboBoxEditable(False)
         
         ok = dlg.exec()
@@ -71,119 +183,77 @@ class GeminiIntegration:
         if not ok:
             return
         
-        prompt = self.build_prompt(choice)
-        if not prompt:
+        if choice == "Cari ayat":
+            self.search_ayat()
             return
         
-        self.execute_gemini_request(prompt, choice)
-
-    def build_prompt(self, choice):
-        user_text = self.parent.text_area.toPlainText()
-        catatan_instruksi = (
-            'Tambahkan field "catatan" yang berisi peringatan crosscheck hasil AI dengan sumber Al-Qur\'an/hadith sahih atau bertanya ke ustadz/guru. '
-            'CATATAN HARUS SINGKAT, JELAS, DAN TIDAK LEBIH DARI 1 KALIMAT. '
-            'JANGAN isi catatan dengan penjelasan ayat/hadith/konten. '
-            'Catatan WAJIB berupa peringatan crosscheck, HARUS berbeda-beda (variatif), dan sebutkan bahwa hasil ini dari AI. '
-            'JANGAN menyalin contoh literal apapun, gunakan variasi kalimat peringatan crosscheck.'
-        )
-        penjelasan_instruksi = (
-            'Tambahkan field "penjelasan" yang berisi penjelasan singkat dan relevan sesuai konteks permintaan user. '
-            'Penjelasan boleh berupa tafsir, konteks, atau makna tambahan, maksimal 2 kalimat.'
-        )
+        if choice == "Cari hadith":
+            self.search_hadith()
+            return
         
-        if choice == "Tulis ulang dalam Arab":
-            return f"""Tuliskan ulang kalimat berikut dalam huruf Arab dengan harakat yang benar.
-Jawab HANYA dalam format JSON berikut, tanpa penjelasan tambahan. {catatan_instruksi} {penjelasan_instruksi}
-
-{{
-  "result": "teks arab dengan harakat yang benar",
-  "penjelasan": "penjelasan singkat sesuai konteks (maksimal 2 kalimat)",
-  "catatan": ""
-}}
-
-Teks input: {user_text}"""
+        if choice in TEXT_PROMPTS:
+            self.execute_text_request(choice, self.get_gemini_settings())
+            return
         
-        elif choice == "Perbaiki (ejaan/harakat)":
-            return f"""Perbaiki ejaan dan harakat pada teks Arab berikut.
-Jawab HANYA dalam format JSON berikut, tanpa penjelasan tambahan. {catatan_instruksi} {penjelasan_instruksi}
-
-{{
-  "result": "teks arab yang sudah diperbaiki",
-  "penjelasan": "penjelasan singkat sesuai konteks (maksimal 2 kalimat)",
-  "catatan": ""
-}}
-
-Teks input: {user_text}"""
+        request = self.build_prompt(choice)
+        if not request:
+            return
         
-        elif choice == "Cek kesalahan":
-            return f"""Cek dan perbaiki kesalahan pada teks Arab berikut.
-Jawab HANYA dalam format JSON berikut, tanpa penjelasan tambahan. {catatan_instruksi} {penjelasan_instruksi}
-
-{{
-  "result": "teks arab yang sudah diperbaiki",
-  "penjelasan": "penjelasan singkat sesuai konteks (maksimal 2 kalimat)",
-  "catatan": ""
-}}
+        prompt, schema = request
+        self.execute_gemini_request(prompt, choice, schema)
 
-Teks input: {user_text}"""
-        
-        elif choice == "Auto harakat":
-            return f"""Tambahkan harakat yang benar pada teks Arab berikut.
-Jawab HANYA dalam format JSON berikut, tanpa penjelasan tambahan. {catatan_instruksi} {penjelasan_instruksi}
-
-{{
-  "result": "teks arab dengan harakat lengkap",
-  "penjelasan": "penjelasan singkat sesuai konteks (maksimal 2 kalimat)",
-  "catatan": ""
-}}
-
-Teks input: {user_text}"""
+    def build_prompt(self, choice, user_text=None):
+        """(prompt, response schema) for choice, or None if the user cancelled"""
+        if choice in TEXT_PROMPTS:
+            return text_prompt(choice, user_text), TEXT_SCHEMAS[choice]
         
         elif choice == "Prompt bebas":
-            return self.get_custom_prompt_with_note(catatan_instruksi + " " + penjelasan_instruksi)
-        
-        elif choice == "Cari ayat":
-            return self.get_ayat_prompt(catatan_instruksi + " " + penjelasan_instruksi)
-        
-        elif choice == "Cari hadith":
-            return self.get_hadith_prompt(catatan_instruksi + " " + penjelasan_instruksi)
+            return self.get_custom_prompt()
         
         return None
 
-    def get_custom_prompt_with_note(self, instruksi):
+    def get_custom_prompt(self):
         custom_dlg = QInputDialog(self.parent)
         custom_dlg.setWindowTitle("Prompt Bebas")
         custom_dlg.setLabelText("Masukkan prompt Gemini:")
-        custom_dlg.setWindowIcon(qta.icon('fa6s.comment-dots', color='green'))
+        custom_dlg.setWindowIcon(get_icon('fa6s.comment-dots', color='green'))
         ok = custom_dlg.exec()
-        custom_prompt = custom_dlg.textValue()
-        if not ok or not custom_prompt.strip():
+        custom_prompt_text = custom_dlg.textValue()
+        if not ok or not custom_prompt_text.strip():
             return None
-        return f"""{custom_prompt.strip()}
-
-Jawab HANYA dalam format JSON dan {instruksi}"""
-
-    def get_ayat_prompt(self, instruksi):
+        return custom_prompt(custom_prompt_text), CUSTOM_SCHEMA
+
+    def search_ayat(self):
+        """
+        "Cari ayat": an exact surah/ayat reference is answered from the local
+        Quran store and a topic from the local search index when they have
+        been built, a surah with a topic but no ayat by searching that surah;
+        Gemini is only asked for what they cannot give (tafsir, cara baca,
+        asbabun nuzul, choosing among the search results).
+        """
         context_dlg = QInputDialog(self.parent)
         context_dlg.setWindowTitle("Cari Ayat")
         context_dlg.setLabelText("Masukkan konteks, topik, atau tema ayat (boleh dikosongkan jika tahu surah/ayat):")
-        context_dlg.setWindowIcon(qta.icon('fa6s.lightbulb', color='gold'))
+        context_dlg.setWindowIcon(get_icon('fa6s.lightbulb', color='gold'))
         ok_context = context_dlg.exec()
         context = context_dlg.textValue().strip() if ok_context else ""
         
         surah_dlg = QInputDialog(self.parent)
         surah_dlg.setWindowTitle("Cari Ayat")
         surah_dlg.setLabelText("Masukkan nomor surah (1-114) atau nama surah (boleh dikosongkan):")
-        surah_dlg.setWindowIcon(qta.icon('fa6s.book-open', color='orange'))
+        surah_dlg.setWindowIcon(get_icon('fa6s.book-open', color='orange'))
         ok_surah = surah_dlg.exec()
         surah = surah_dlg.textValue().strip() if ok_surah else ""
         
         ayat_dlg = QInputDialog(self.parent)
         ayat_dlg.setWindowTitle("Cari Ayat")
         ayat_dlg.setLabelText("Masukkan nomor ayat (atau rentang, misal 1-5, boleh dikosongkan):")
-        ayat_dlg.setWindowIcon(qta.icon('fa6s.book-open', color='orange'))
+        ayat_dlg.setWindowIcon(get_icon('fa6s.book-open', color='orange'))
         ok_ayat = ayat_dlg.exec()
         ayat = ayat_dlg.textValue().strip() if ok_ayat else ""
+        # A surah without ayat narrows a topic down rather than asking for all of its ayat
+        local = self.lookup_ayat(surah, ayat) if ayat or not context else None
+        hits = self.search_ayat_topic(context, surah) if local is None and not ayat else []
         
         options = ["Ya", "Tidak"]
         
@@ -191,210 +261,423 @@ Jawab HANYA dalam format JSON dan {instruksi}"""
         arti_dlg.setWindowTitle("Opsi Ayat")
         arti_dlg.setLabelText("Sertakan arti?")
         arti_dlg.setComboBoxItems(options)
-        arti_dlg.setWindowIcon(qta.icon('fa6s.language', color='green'))
+        arti_dlg.setWindowIcon(get_icon('fa6s.language', color='green'))
         ok_arti = arti_dlg.exec()
         sertakan_arti = arti_dlg.textValue()
         if not ok_arti:
-            return None
+            return
         
         baca_dlg = QInputDialog(self.parent)
         baca_dlg.setWindowTitle("Opsi Ayat")
         baca_dlg.setLabelText("Sertakan cara baca (latin)?")
         baca_dlg.setComboBoxItems(options)
-        baca_dlg.setWindowIcon(qta.icon('fa6s.microphone', color='purple'))
+        baca_dlg.setWindowIcon(get_icon('fa6s.microphone', color='purple'))
         ok_baca = baca_dlg.exec()
         sertakan_cara_baca = baca_dlg.textValue()
         if not ok_baca:
-            return None
+            return
         
         asbab_dlg = QInputDialog(self.parent)
         asbab_dlg.setWindowTitle("Opsi Ayat")
         asbab_dlg.setLabelText("Sertakan asbabun nuzul?")
         asbab_dlg.setComboBoxItems(options)
-        asbab_dlg.setWindowIcon(qta.icon('fa6s.clock-rotate-left', color='brown'))
+        asbab_dlg.setWindowIcon(get_icon('fa6s.clock-rotate-left', color='brown'))
         ok_asbab = asbab_dlg.exec()
         sertakan_asbab = asbab_dlg.textValue()
         if not ok_asbab:
+            return
+
+        wanted = {"arti": sertakan_arti, "cara_baca": sertakan_cara_baca, "asbabun_nuzul": sertakan_asbab}
+        parts = [part for part, answer in wanted.items() if answer == "Ya"]
+        if local is None and not hits:
+            self.execute_gemini_request(ayat_prompt(context, surah, ayat, parts), "Cari ayat", ayat_schema(parts))
+            return
+
+        tafsir_dlg = QInputDialog(self.parent)
+        tafsir_dlg.setWindowTitle("Opsi Ayat")
+        tafsir_dlg.setLabelText("Pilih dan jelaskan hasil pencarian dengan AI?" if hits
+                                else "Sertakan tafsir/penjelasan dari AI?")
+        tafsir_dlg.setComboBoxItems(options)
+        tafsir_dlg.setWindowIcon(get_icon('fa6s.star', color='deepskyblue'))
+        ok_tafsir = tafsir_dlg.exec()
+        sertakan_tafsir = tafsir_dlg.textValue()
+        if not ok_tafsir:
+            return
+
+        if hits:
+            if sertakan_tafsir == "Ya" or "cara_baca" in parts or "asbabun_nuzul" in parts:
+                self.select_topic_hits(context, hits, parts)
+            else:
+                self.show_topic_hits(hits[:QURAN_SEARCH_RESULTS], "arti" in parts)
+            return
+
+        reference, verses = local
+        verses_text = format_verses(verses)
+        text = f"{verses_text}\n\n{reference}"
+        # The translation store answers "arti" as well, leaving Gemini only what needs explaining
+        translated = self.lookup_ayat(surah, ayat, TRANSLATION_PATH) if "arti" in parts else None
+        if translated is not None:
+            text += "\n\n" + format_translation(translated[1])
+            parts.remove("arti")
+        catatan = ("Teks ayat dan artinya diambil dari mushaf lokal, bukan dari AI." if translated
+                   else "Teks ayat diambil dari mushaf lokal, bukan dari AI.")
+        explained_text = verses_text
+        if len(verses) > QURAN_EXPLAIN_MAX_VERSES:
+            # Per-ayat parts of a long range would not fit in one answer
+            kept = [part for part in parts if part not in ("arti", "cara_baca")]
+            if kept != parts:
+                catatan += (f" Arti/cara baca dari AI tidak disertakan untuk lebih dari {QURAN_EXPLAIN_MAX_VERSES} "
+                            "ayat; pilih rentang ayat yang lebih pendek.")
+            parts = kept
+            explained_text = None
+        explain = bool(parts or context) or sertakan_tafsir == "Ya"
+        target = self.write_result(text)
+        self.parent.show_catatan(catatan)
+        if not explain:
+            return
+        # The explanation is written after the ayat, which stay as they are
+        self.execute_gemini_request(ayat_explain_prompt(reference, explained_text, context, parts), "Cari ayat",
+                                    ayat_schema(parts, text_known=True), ResultTarget.after(target))
+
+    def search_ayat_topic(self, context, surah=""):
+        """[(surah, ayat, score)] from the local search index, only from surah if given, or [] if it cannot answer"""
+        number = find_surah(surah) if surah else None
+        if not context or (surah and number is None):
+            return []
+        try:
+            search = get_quran_search()
+        except (OSError, ValueError) as e:
+            print(f"Quran search index unavailable: {e}")
+            return []
+        if search is None:
+            return []
+        return search.search(context, QURAN_SEARCH_CANDIDATES, number)
+
+    def describe_hit(self, surah, ayat):
+        """Citation and text of a search hit, the translation where available"""
+        store = self.open_quran_store(TRANSLATION_PATH) or self.open_quran_store()
+        reference = format_reference(surah, ayat, ayat)
+        return f"{reference}: {store.verse(surah, ayat)}" if store else reference
+
+    def select_topic_hits(self, context, hits, parts):
+        """
+        Ask Gemini to choose among the search hits and explain them. Only the
+        chosen references and the explanation come back; the verses are
+        written from the local store once the answer arrives.
+        """
+        with_translation = "arti" in parts
+        if self.open_quran_store(TRANSLATION_PATH) is not None:
+            parts = [part for part in parts if part != "arti"]
+        candidates = {f"{surah}:{ayat}": (surah, ayat, score) for surah, ayat, score in hits}
+        described = [(key, self.describe_hit(surah, ayat)) for key, (surah, ayat, _) in candidates.items()]
+        job_id = self.execute_gemini_request(ayat_select_prompt(context, described, QURAN_SEARCH_RESULTS, parts),
+                                             "Cari ayat", ayat_select_schema(candidates, parts))
+        self.selections[job_id] = (candidates, with_translation)
+
+    def on_selection_finished(self, target, obj, candidates, with_translation):
+        """Write the verses Gemini chose, in its order, followed by its explanation"""
+        keys = obj.get("ayat")
+        keys = [key for key in keys if isinstance(key, str)] if isinstance(keys, list) else []
+        chosen = [candidates[key] for key in dict.fromkeys(keys) if key in candidates][:QURAN_SEARCH_RESULTS]
+        if not chosen:
+            chosen = list(candidates.values())[:QURAN_SEARCH_RESULTS]
+        main_text, catatan = self.extract_main_and_catatan(obj)
+        text = self.format_topic_hits(chosen, with_translation)
+        target.replace(text + ("\n\n" + main_text if main_text else ""))
+        self.parent.show_catatan(catatan or "Teks ayat diambil dari mushaf lokal; pilihan dan penjelasannya dari AI.")
+
+    def show_topic_hits(self, hits, with_translation):
+        """Write the verses found by the local search, each with its citation"""
+        self.write_result(self.format_topic_hits(hits, with_translation))
+        self.parent.show_catatan("Hasil pencarian kata kunci di mushaf lokal, bukan dari AI; "
+                                 "periksa kesesuaian ayat dengan topik.")
+
+    def format_topic_hits(self, hits, with_translation):
+        """Verses of (surah, ayat, score) hits from the local store, each with its citation"""
+        arabic = self.open_quran_store()
+        translation = self.open_quran_store(TRANSLATION_PATH) if with_translation or arabic is None else None
+        blocks = []
+        for surah, ayat, _ in hits:
+            lines = []
+            if arabic is not None:
+                lines.append(format_verses([(ayat, arabic.verse(surah, ayat))]))
+            lines.append(format_reference(surah, ayat, ayat))
+            if translation is not None:
+                lines.append(translation.verse(surah, ayat))
+            blocks.append("\n".join(lines))
+        return "\n\n".join(blocks)
+
+    def open_quran_store(self, path=None):
+        """Shared local Quran store for path, or None if it is missing or unreadable"""
+        try:
+            return get_quran_store(path)
+        except (OSError, ValueError) as e:
+            print(f"Quran store unavailable: {e}")
+            return None
+
+    def lookup_ayat(self, surah, ayat, path=None):
+        """(citation, verses) from the local Quran store for path, or None if it cannot answer"""
+        store = self.open_quran_store(path) if surah else None
+        if store is None:
             return None
+        return store.lookup(f"{surah}:{ayat}" if ayat else surah)
 
-        note_instruction = instruksi
-
-        if (not surah and not ayat) and context:
-            prompt = f"""Carikan ayat Al-Qur'an yang relevan dengan topik atau konteks berikut: "{context}".
-Tampilkan ayat Arab lengkap dengan harakat.
-Pada hasil JSON, field "sumber" WAJIB diisi dengan format: Nama Surah: Nomor Ayat. Jika tidak tahu pasti, tuliskan sumber ayat sebisa mungkin.
-JANGAN menyalin atau mencontohkan format literal apapun, selalu isi field "sumber" dengan sumber ayat yang benar sesuai hasil pencarian.
-{note_instruction}"""
-            if sertakan_arti == "Ya":
-                prompt += "\nSertakan juga artinya dalam bahasa Indonesia."
-            if sertakan_cara_baca == "Ya":
-                prompt += "\nSertakan juga cara bacanya (latin/transliterasi)."
-            if sertakan_asbab == "Ya":
-                prompt += "\nSertakan juga asbabun nuzul jika tersedia."
-            prompt += """
-Jawab HANYA dalam format JSON berikut, tanpa penjelasan tambahan:
-
-{
-  "result": "teks ayat arab dengan harakat",
-  "arti": "arti ayat (jika diminta)",
-  "cara_baca": "cara baca latin (jika diminta)",
-  "asbabun_nuzul": "asbabun nuzul (jika diminta)",
-  "penjelasan": "penjelasan singkat sesuai konteks (maksimal 2 kalimat)",
-  "catatan": "",
-  "sumber": "Nama Surah: Nomor Ayat"
-}"""
-            return prompt
-
-        prompt = f"""Tulis ayat Al-Qur'an"""
-        if surah:
-            prompt += f" surah {surah}"
-        if ayat:
-            prompt += f" ayat {ayat}"
-        prompt += " dalam huruf Arab lengkap dengan harakat."
-        prompt += "\nPada hasil JSON, field \"sumber\" WAJIB diisi dengan format: Nama Surah: Nomor Ayat. Jika tidak tahu pasti, tuliskan sumber ayat sebisa mungkin."
-        prompt += "\nJANGAN menyalin atau mencontohkan format literal apapun, selalu isi field \"sumber\" dengan sumber ayat yang benar sesuai hasil pencarian."
-        prompt += f"\n{note_instruction}"
-        if sertakan_arti == "Ya":
-            prompt += "\nSertakan juga artinya dalam bahasa Indonesia."
-        if sertakan_cara_baca == "Ya":
-            prompt += "\nSertakan juga cara bacanya (latin/transliterasi)."
-        if sertakan_asbab == "Ya":
-            prompt += "\nSertakan juga asbabun nuzul jika tersedia."
-        if context:
-            prompt += f"\nJika memungkinkan, prioritaskan ayat yang relevan dengan konteks/topik berikut: \"{context}\"."
-        prompt += """
-Jawab HANYA dalam format JSON berikut, tanpa penjelasan tambahan:
-
-{
-  "result": "teks ayat arab dengan harakat",
-  "arti": "arti ayat (jika diminta)",
-  "cara_baca": "cara baca latin (jika diminta)",
-  "asbabun_nuzul": "asbabun nuzul (jika diminta)",
-  "penjelasan": "penjelasan singkat sesuai konteks (maksimal 2 kalimat)",
-  "catatan": "",
-  "sumber": "Nama Surah: Nomor Ayat"
-}"""
-        return prompt
-
-    def get_hadith_prompt(self, catatan_instruksi):
+    def search_hadith(self):
+        """
+        "Cari hadith": keywords are looked up in the local hadith collection
+        when one has been loaded; Gemini is only asked when it finds nothing.
+        """
         topik_dlg = QInputDialog(self.parent)
         topik_dlg.setWindowTitle("Cari Hadith")
         topik_dlg.setLabelText("Masukkan topik, konteks, atau kata kunci hadith:")
-        topik_dlg.setWindowIcon(qta.icon('fa6s.book-bookmark', color='purple'))
+        topik_dlg.setWindowIcon(get_icon('fa6s.book-bookmark', color='purple'))
         ok_topik = topik_dlg.exec()
         topik = topik_dlg.textValue()
         if not ok_topik or not topik.strip():
-            return None
+            return
         
-        return """Carikan hadith sahih yang berkaitan dengan topik: "{}"
-
-PENTING: 
-- HANYA tampilkan hadith yang benar-benar SAHIH dari Bukhari, Muslim, atau koleksi sahih lainnya
-- Jika hadith diragukan atau tidak sahih, berikan peringatan jelas
-- Jika tidak menemukan hadith sahih tentang topik ini, katakan dengan jujur
-- Sertakan sumber yang jelas (nama kitab, nomor hadith)
-- {} Tambahkan field "penjelasan" yang berisi penjelasan singkat dan relevan sesuai konteks permintaan user. Penjelasan boleh berupa makna, konteks, atau ringkasan hadith, maksimal 2 kalimat. Catatan tetap hanya untuk peringatan crosscheck.
-
-Jawab HANYA dalam format JSON berikut:
-
-{{
-  "result": "teks hadith dalam bahasa Arab (jika ada)",
-  "hadith_text": "terjemahan hadith dalam bahasa Indonesia",
-  "hadith_source": "sumber hadith (kitab, nomor, perawi)",
-  "hadith_warning": "peringatan jika hadith diragukan atau saran untuk cross-check ke ustadz/guru (jika perlu)",
-  "penjelasan": "penjelasan singkat sesuai konteks (maksimal 2 kalimat)",
-  "catatan": "",
-  "sumber": "Nama Kitab: Nomor Hadith"
-}}
-
-Topik: {}""".format(topik, catatan_instruksi, topik)
-
-    def execute_gemini_request(self, prompt, choice):
-        self.progress_dialog = self.create_progress_dialog("AI Gemini", f"Memproses permintaan: {choice}...")
-        self.progress_dialog.canceled.connect(self.on_progress_cancelled)
+        hits = self.search_local_hadith(topik)
+        if not hits:
+            self.execute_gemini_request(hadith_prompt(topik), "Cari hadith", HADITH_SCHEMA)
+            return
         
-        self.worker = GeminiWorker(prompt)
-        self.worker.finished.connect(self.on_gemini_finished)
-        self.worker.error.connect(self.on_gemini_error)
-        self.worker.start()
+        blocks = []
+        for book, number, narrator, arabic, translation in hits:
+            source = f"HR. {book} no. {number}"
+            if narrator:
+                source += f", dari {narrator}"
+            blocks.append("\n".join(part for part in (arabic, translation, source) if part))
+        self.write_result("\n\n".join(blocks))
+        self.parent.show_catatan("Hadith diambil dari koleksi lokal berdasarkan kata kunci, bukan dari AI; "
+                                 "periksa derajat dan konteksnya.")
+
+    def search_local_hadith(self, topik):
+        """Matches from the local hadith collection, or [] if there is none"""
+        try:
+            store = get_hadith_store()
+            return store.search(topik, HADITH_SEARCH_RESULTS) if store is not None else []
+        except (OSError, sqlite3.Error) as e:
+            print(f"Hadith store unavailable: {e}")
+            return []
+
+    def submit_job(self, title, prompt, schema, choice, settings):
+        """
+        Queue a prompt under the shared system instruction, asking for a JSON
+        response of the given schema, and report its size first
+        """
+        tokens = count_input_tokens(prompt, SYSTEM_INSTRUCTION)
+        print(f"Gemini: {title}: ~{tokens} token input")
+        self.job_queue.set_max_concurrent(settings["max_concurrent_jobs"])
+        return self.job_queue.submit(f"{title} (~{tokens} token)", prompt, GEMINI_JOB_PRIORITIES.get(choice, 0),
+                                     settings["timeout"], SYSTEM_INSTRUCTION, schema)
+
+    def new_block(self):
+        """
+        Target for a result that adds text: a new paragraph after the one
+        holding the cursor. A running job whose range covers that spot is
+        cancelled, as it would otherwise write over this result.
+        """
+        target = ResultTarget.new_block(self.parent.text_area)
+        overlapping = [job_id for job_id, other in self.targets.items() if target.overlaps(other)]
+        if not overlapping:
+            return target
+        for job_id in overlapping:
+            self.job_queue.cancel(job_id)
+        # Their text has been put back, which moves the end of the paragraph
+        return ResultTarget.new_block(self.parent.text_area)
+
+    def free_ranges(self):
+        """(start, end) positions of the editor text that no running job writes into"""
+        taken = sorted((target.cursor.selectionStart(), target.cursor.selectionEnd())
+                       for target in self.targets.values())
+        ranges = []
+        pos = 0
+        for start, end in taken:
+            if start > pos:
+                ranges.append((pos, start))
+            pos = max(pos, end)
+        end = self.parent.text_area.document().characterCount() - 1
+        if end > pos:
+            ranges.append((pos, end))
+        return ranges
+
+    def write_result(self, text):
+        """Write a locally found result into a new paragraph, returning its target"""
+        target = self.new_block()
+        target.replace(text)
+        return target
+
+    def execute_gemini_request(self, prompt, choice, schema, target=None):
+        """Queue a request whose result goes into target, by default a new paragraph at the cursor"""
+        job_id = self.submit_job(choice, prompt, schema, choice, self.get_gemini_settings())
+        self.targets[job_id] = target or self.new_block()
+        return job_id
+
+    def execute_text_request(self, choice, settings):
+        """
+        Send the editor text to an action that rewrites it in place. Text a
+        running job is still writing into is left out, so jobs never write
+        over each other. Long text of the chunked actions goes as independent
+        chunks; the job queue bounds how many run at once, and each result is
+        written into its own span as soon as it arrives, so the document fills
+        in order without a reassembly step.
+        """
+        text_area = self.parent.text_area
+        limit = chunk_limit(settings["chunk_chars"], settings["max_tokens"])
+        pieces = []
+        for start, end in self.free_ranges():
+            text = ResultTarget.span(text_area, start, end).original
+            spans = split_document(text, limit if choice in GEMINI_CHUNKED_ACTIONS else len(text))
+            for (first, last), (first_pos, last_pos) in zip(spans, utf16_spans(text, spans)):
+                pieces.append((text[first:last], ResultTarget.span(text_area, start + first_pos, start + last_pos)))
+        if not pieces:
+            QMessageBox.information(self.parent, "AI Gemini",
+                                    "Tidak ada teks untuk diproses (teks kosong atau sedang diproses permintaan lain).")
+            return
+        if len(pieces) == 1:
+            text, target = pieces[0]
+            prompt, schema = self.build_prompt(choice, text)
+            self.execute_gemini_request(prompt, choice, schema, target)
+            return
+        batch = DocumentBatch(choice, len(pieces))
+        for index, (text, target) in enumerate(pieces):
+            self.submit_chunk(DocumentChunk(batch, index, text, target), settings)
+
+    def submit_chunk(self, chunk, settings):
+        chunk.attempts += 1
+        title = f"{chunk.batch.choice} {chunk.index + 1}/{chunk.batch.total}"
+        if chunk.attempts > 1:
+            title += f" (ulang {chunk.attempts - 1})"
+        prompt, schema = self.build_prompt(chunk.batch.choice, chunk.text)
+        job_id = self.submit_job(title, prompt, schema, chunk.batch.choice, settings)
+        self.targets[job_id] = chunk.target
+        self.chunks[job_id] = chunk
+
+    def on_chunk_finished(self, chunk, response):
+        obj = decode_structured_response(response)
+        if obj is None:
+            self.on_chunk_error(chunk, "Jawaban bukan JSON yang valid")
+            return
+        result = obj.get("answer")
+        if not isinstance(result, str) or not result:
+            self.on_chunk_error(chunk, "Jawaban tidak berisi field answer")
+            return
+        chunk.target.replace(result.strip())
+        if not chunk.batch.catatan:
+            chunk.batch.catatan = obj.get("catatan") or ""
+        self.finish_chunk(chunk)
+
+    def on_chunk_error(self, chunk, error_message):
+        chunk.target.restore()
+        settings = self.get_gemini_settings()
+        if chunk.attempts <= settings["chunk_retries"]:
+            self.submit_chunk(chunk, settings)
+            return
+        chunk.batch.failed.append((chunk.index, error_message))
+        self.finish_chunk(chunk)
+
+    def finish_chunk(self, chunk):
+        batch = chunk.batch
+        batch.pending -= 1
+        if batch.pending:
+            return
+        self.parent.show_catatan(batch.catatan)
+        if batch.failed:
+            details = "\n".join(f"Bagian {index + 1}: {message}" for index, message in sorted(batch.failed))
+            QMessageBox.warning(
+                self.parent, "Kesalahan Gemini",
+                f"{len(batch.failed)} dari {batch.total} bagian gagal diproses dan dibiarkan seperti semula.\n\n{details}"
+            )
+
+    def on_gemini_partial(self, job_id, response):
+        """Show the "answer" field as soon as it can be read from the partial JSON"""
+        target = self.targets.get(job_id)
+        result = extract_partial_json_string(response, "answer")
+        if target is None or not result:
+            return
+        if target.text is None and self.job_panel:
+            self.job_panel.set_status(job_id, "menerima jawaban")
+        target.replace(result)
 
-    def on_gemini_finished(self, response):
+    def on_gemini_finished(self, job_id, response):
         print("=== RAW GEMINI RESPONSE ===")
         print(response)
         print("==========================")
         
-        self.progress_dialog.close()
-        self.progress_dialog = None
+        target = self.targets.pop(job_id, None)
+        if target is None:
+            return
+        chunk = self.chunks.pop(job_id, None)
+        if chunk is not None:
+            self.on_chunk_finished(chunk, response)
+            return
+        selection = self.selections.pop(job_id, None)
 
-        main_text, catatan = self.extract_main_and_catatan(response)
+        obj = decode_structured_response(response)
+        if obj is None:
+            target.restore()
+            QMessageBox.critical(self.parent, "Kesalahan Gemini", "Kesalahan: Jawaban bukan JSON yang valid")
+            return
+        if selection is not None:
+            self.on_selection_finished(target, obj, *selection)
+            return
+        main_text, catatan = self.extract_main_and_catatan(obj)
         main_text = re.sub(r'(\n+)[\.\•]+\s*', r'\1', main_text)
         main_text = re.sub(r'^[\.\•]+\s*', '', main_text)
-        self.parent.text_area.setPlainText(main_text)
+        target.replace(main_text)
         self.parent.show_catatan(catatan)
-        
-        self.worker = None
 
-    def extract_main_and_catatan(self, response):
-        if not response:
-            return "", ""
-        try:
-            json_match = re.search(r'```(?:json)?\s*\n(.*?)\n```', response, re.DOTALL | re.IGNORECASE)
-            if json_match:
-                json_str = json_match.group(1)
-            else:
-                json_str = None
-            if not json_str:
-                # Cari inline JSON
-                json_inline = re.search(r'(\{.*?\})', response, re.DOTALL)
-                if json_inline:
-                    json_str = json_inline.group(1)
-            if json_str:
-                obj = json.loads(json_str)
-                # Parse and order fields correctly with penjelasan included
-                fields = [
-                    ("result", False),
-                    ("cara_baca", False),
-                    ("arti", False),
-                    ("asbabun_nuzul", False),
-                    ("hadith_text", False),
-                    ("hadith_source", False),
-                    ("hadith_warning", True),
-                    ("penjelasan", False)
-                ]
-                lines = []
-                for key, is_warning in fields:
-                    value = obj.get(key)
-                    if value and key != "sumber":
-                        if is_warning:
-                            lines.append("⚠️ " + str(value))
-                        else:
-                            lines.append(str(value))
-                # Always add sumber at the end if it exists
-                sumber = obj.get("sumber") or ""
-                if sumber:
-                    lines.append(str(sumber))
-                main_text = "\n\n".join(lines).strip()
-                catatan = obj.get("catatan") or obj.get("note") or ""
-                return main_text, catatan
-        except Exception:
-            pass
-        # Jika gagal, fallback ke parser lama
-        parsed = parse_gemini_response(response)
-        # Cari catatan dengan regex
-        catatan_match = re.search(r'(catatan|note)[\s:"]+(.+)', response, re.IGNORECASE)
-        catatan = catatan_match.group(2).strip() if catatan_match else ""
-        return parsed, catatan
-
-    def on_gemini_error(self, error_message):
+    def extract_main_and_catatan(self, obj):
+        """Editor text (the answer fields in display order) and catatan of a decoded response"""
+        fields = [
+            ("answer", False),
+            ("cara_baca", False),
+            ("arti", False),
+            ("asbabun_nuzul", False),
+            ("hadith_text", False),
+            ("hadith_source", False),
+            ("hadith_warning", True),
+            ("penjelasan", False)
+        ]
+        lines = []
+        for key, is_warning in fields:
+            value = obj.get(key)
+            if value:
+                if is_warning:
+                    lines.append("⚠️ " + str(value))
+                else:
+                    lines.append(str(value))
+        # Always add sumber at the end if it exists
+        sumber = obj.get("sumber") or ""
+        if sumber:
+            lines.append(str(sumber))
+        main_text = "\n\n".join(lines).strip()
+        catatan = obj.get("catatan") or ""
+        return main_text, catatan
+
+    def on_gemini_error(self, job_id, error_message):
         """Handle Gemini error"""
-        self.progress_dialog.close()
-        self.progress_dialog = None
+        target = self.targets.pop(job_id, None)
+        self.selections.pop(job_id, None)
+        chunk = self.chunks.pop(job_id, None)
+        if chunk is not None:
+            self.on_chunk_error(chunk, error_message)
+            return
+        if target is not None:
+            target.restore()
         QMessageBox.critical(self.parent, "Kesalahan Gemini", f"Kesalahan: {error_message}")
-        self.worker = None
-
-    def on_progress_cancelled(self):
-        """Handle progress dialog cancellation"""
-        if self.worker and self.worker.isRunning():
-            self.worker.terminate()
-            self.worker.wait()
-        self.worker = None
+
+    def on_job_cancelled(self, job_id):
+        self.selections.pop(job_id, None)
+        target = self.targets.pop(job_id, None)
+        if target is not None:
+            target.restore()
+        chunk = self.chunks.pop(job_id, None)
+        if chunk is not None:
+            self.finish_chunk(chunk)
+
+    def get_gemini_settings(self):
+        """Gemini settings from config.json, re-read if the file changed"""
+        settings_manager = self.parent.settings_manager
+        settings_manager.reload_if_changed()
+        return settings_manager.get_gemini_settings()
@@ -0,0 +1,182 @@
+"""
+Concurrent Gemini job queue for Arabic Typing Helper
+"""
+
+import threading
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QProgressBar, QToolButton
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from icon_cache import get_icon
+from gemini_ai_helper import stream_gemini, CancelToken, RequestCancelled
+
+
+class JobSignals(QObject):
+    """Signals of one job; emitted from a pool thread, delivered on the GUI thread"""
+    started = Signal(int)
+    partial = Signal(int, str)
+    finished = Signal(int, str)
+    error = Signal(int, str)
+
+
+class GeminiJob(QRunnable):
+    """One streamed Gemini request, run on the queue's thread pool"""
+
+    def __init__(self, job_id, title, prompt, timeout=None, system_instruction=None, response_schema=None):
+        super().__init__()
+        # The queue owns the job until it reports back
+        self.setAutoDelete(False)
+        self.job_id = job_id
+        self.title = title
+        self.prompt = prompt
+        self.timeout = timeout
+        self.system_instruction = system_instruction
+        self.response_schema = response_schema
+        self.token = CancelToken()
+        self.signals = JobSignals()
+        self.done = threading.Event()
+
+    def run(self):
+        try:
+            # Time spent waiting in the queue does not count against the deadline
+            self.token.set_deadline(self.timeout)
+            self.signals.started.emit(self.job_id)
+            response = ""
+            for chunk in stream_gemini(self.prompt, token=self.token,
+                                       system_instruction=self.system_instruction,
+                                       response_schema=self.response_schema):
+                response += chunk
+                self.signals.partial.emit(self.job_id, response)
+            self.signals.finished.emit(self.job_id, response)
+        except RequestCancelled as e:
+            # A user cancel needs no message; a timeout does
+            if not self.token.cancelled:
+                self.signals.error.emit(self.job_id, str(e))
+        except Exception as e:
+            self.signals.error.emit(self.job_id, str(e))
+        finally:
+            self.done.set()
+
+
+class GeminiJobQueue(QObject):
+    """
+    Runs Gemini jobs on a bounded, reusable thread pool. Up to max_concurrent
+    jobs run at once; waiting jobs start in priority order.
+    """
+    job_added = Signal(int, str)
+    job_started = Signal(int)
+    job_removed = Signal(int)
+    cancelled = Signal(int)
+    partial = Signal(int, str)
+    finished = Signal(int, str)
+    error = Signal(int, str)
+
+    def __init__(self, max_concurrent=3, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, max_concurrent))
+        self.jobs = {}
+        self.cancelled_jobs = []
+        self.next_id = 1
+
+    def set_max_concurrent(self, max_concurrent):
+        self.pool.setMaxThreadCount(max(1, max_concurrent))
+
+    def submit(self, title, prompt, priority=0, timeout=None, system_instruction=None, response_schema=None):
+        """Queue a request and return its job id"""
+        job_id = self.next_id
+        self.next_id += 1
+        job = GeminiJob(job_id, title, prompt, timeout, system_instruction, response_schema)
+        job.signals.started.connect(self.job_started)
+        job.signals.partial.connect(self.partial)
+        job.signals.finished.connect(self.on_job_finished)
+        job.signals.error.connect(self.on_job_error)
+        self.jobs[job_id] = job
+        self.job_added.emit(job_id, title)
+        self.pool.start(job, priority)
+        return job_id
+
+    def on_job_finished(self, job_id, response):
+        if self.remove(job_id):
+            self.finished.emit(job_id, response)
+
+    def on_job_error(self, job_id, message):
+        if self.remove(job_id):
+            self.error.emit(job_id, message)
+
+    def remove(self, job_id):
+        job = self.jobs.pop(job_id, None)
+        if job is None:
+            return None
+        self.job_removed.emit(job_id)
+        return job
+
+    def cancel(self, job_id):
+        """Drop a job; a waiting job never starts, a running one stops at its next check"""
+        job = self.remove(job_id)
+        if job is None:
+            return
+        job.signals.blockSignals(True)
+        job.token.cancel()
+        self.cancelled.emit(job_id)
+        # A running job is kept referenced until its thread is done with it
+        self.cancelled_jobs = [j for j in self.cancelled_jobs if not j.done.is_set()]
+        if not self.pool.tryTake(job) and not job.done.is_set():
+            self.cancelled_jobs.append(job)
+
+    def cancel_all(self):
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+
+
+class GeminiJobPanel(QWidget):
+    """Non-modal list of queued and running jobs, one row with a cancel button per job"""
+
+    def __init__(self, queue, parent=None):
+        super().__init__(parent)
+        self.queue = queue
+        self.rows = {}
+        self.rows_layout = QVBoxLayout(self)
+        self.rows_layout.setContentsMargins(0, 4, 0, 0)
+        self.rows_layout.setSpacing(2)
+        queue.job_added.connect(self.add_row)
+        queue.job_started.connect(self.mark_running)
+        queue.job_removed.connect(self.remove_row)
+        self.setVisible(False)
+
+    def add_row(self, job_id, title):
+        row = QWidget(self)
+        row_layout = QHBoxLayout(row)
+        row_layout.setContentsMargins(0, 0, 0, 0)
+        label = QLabel(f"{title} (menunggu)", row)
+        bar = QProgressBar(row)
+        bar.setRange(0, 0)
+        bar.setTextVisible(False)
+        bar.setMaximumHeight(8)
+        bar.setVisible(False)
+        cancel_btn = QToolButton(row)
+        cancel_btn.setIcon(get_icon('fa6s.xmark', color='gray'))
+        cancel_btn.setToolTip("Batalkan permintaan ini")
+        cancel_btn.clicked.connect(lambda: self.queue.cancel(job_id))
+        row_layout.addWidget(label)
+        row_layout.addWidget(bar, 1)
+        row_layout.addWidget(cancel_btn)
+        self.rows_layout.addWidget(row)
+        self.rows[job_id] = (row, label, bar, title)
+        self.setVisible(True)
+
+    def mark_running(self, job_id):
+        if job_id in self.rows:
+            row, label, bar, title = self.rows[job_id]
+            label.setText(f"{title}...")
+            bar.setVisible(True)
+
+    def set_status(self, job_id, status):
+        if job_id in self.rows:
+            row, label, bar, title = self.rows[job_id]
+            label.setText(f"{title}: {status}")
+
+    def remove_row(self, job_id):
+        entry = self.rows.pop(job_id, None)
+        if entry is None:
+            return
+        entry[0].deleteLater()
+        self.setVisible(bool(self.rows))
@@ -1,123 +1,124 @@
 import re
 import json
+from bisect import bisect_left
 
-def parse_gemini_response(response):
-    """
-    Parse Gemini response to extract clean text for the textarea.
-    If JSON is found, return all fields as multi-line text without field names.
-    """
-    if not response:
-        return ""
-    json_obj = extract_json_object_from_response(response)
-    if json_obj:
-        return format_json_fields(json_obj)
-    text = response.strip()
-    if text.startswith("```") and text.endswith("```"):
-        lines = text.split('\n')
-        if len(lines) > 2:
-            text = '\n'.join(lines[1:-1])
-        else:
-            text = text[3:-3]
-    text = re.sub(r'`([^`]+)`', r'\1', text)
-    explanation_patterns = [
-        r'^Here\'s the.*?:\s*',
-        r'^Here is the.*?:\s*',
-        r'^The corrected.*?:\s*',
-        r'^Corrected.*?:\s*',
-        r'^Result.*?:\s*',
-        r'^Answer.*?:\s*',
-        r'^Translation.*?:\s*',
-    ]
-    for pattern in explanation_patterns:
-        text = re.sub(pattern, '', text, flags=re.IGNORECASE | re.MULTILINE)
-    text = re.sub(r'\n\s*\n', '\n\n', text)
-    text = re.sub(r'[ \t]+', ' ', text)
-    return text.strip()
+# Next structural character inside an object, and inside a string
+_OBJECT_TOKEN = re.compile(r'[{}"]')
+_STRING_TOKEN = re.compile(r'["\\]')
 
-def extract_json_object_from_response(response):
-    """
-    Extract JSON object from Gemini response.
-    Tries to find JSON in code blocks or inline.
-    """
-    if not response:
+def _skip_string(text, pos):
+    """Return the index just past the string whose opening quote precedes pos"""
+    while True:
+        match = _STRING_TOKEN.search(text, pos)
+        if match is None:
+            return len(text)
+        if match.group() == '"':
+            return match.end()
+        pos = match.end() + 1
+
+def _decode_object(text, start, end):
+    try:
+        obj = json.loads(text[start:end], strict=False)
+    except ValueError:
         return None
-    json_patterns = [
-        r'```json\s*\n(.*?)\n```',
-        r'```\s*\n(\{.*?\})\n```',
-        r'```\s*(\{.*?\})```',
-    ]
-    for pattern in json_patterns:
-        match = re.search(pattern, response, re.DOTALL | re.IGNORECASE)
-        if match:
-            try:
-                return json.loads(match.group(1))
-            except json.JSONDecodeError:
-                continue
-    json_match = re.search(r'\{.*?\}', response, re.DOTALL)
-    if json_match:
-        try:
-            return json.loads(json_match.group(0))
-        except json.JSONDecodeError:
-            pass
-    return None
+    return obj if isinstance(obj, dict) else None
 
-def format_json_fields(json_obj):
+def find_json_object(text):
     """
-    Format JSON object fields as content only without field names.
+    Return the first complete JSON object in text, decoded, or None.
+
+    One left-to-right pass counts braces outside JSON strings and skips
+    escapes inside them, so nested objects, braces inside strings, code
+    fences and prose around the object are all handled. Each candidate is
+    decoded at most once and candidates never overlap, so the cost stays
+    linear in the length of the response, including on malformed input.
+    A stray "{" that never closes does not hide an object after it.
     """
-    if not isinstance(json_obj, dict):
-        return ""
-    
-    lines = []
-    
-    # 1. Ayat
-    if "result" in json_obj and json_obj["result"]:
-        lines.append(str(json_obj["result"]))
-    # 2. Cara baca
-    if "cara_baca" in json_obj and json_obj["cara_baca"]:
-        lines.append("\n" + str(json_obj["cara_baca"]))
-    # 3. Arti
-    if "arti" in json_obj and json_obj["arti"]:
-        lines.append("\n" + str(json_obj["arti"]))
-    # 4. Asbabun nuzul
-    if "asbabun_nuzul" in json_obj and json_obj["asbabun_nuzul"]:
-        lines.append("\n" + str(json_obj["asbabun_nuzul"]))
-    # 5. Sumber
-    if "sumber" in json_obj and json_obj["sumber"]:
-        lines.append("\n" + str(json_obj["sumber"]))
-    # 6. Hadith (jika ada)
-    if "hadith_text" in json_obj and json_obj["hadith_text"]:
-        lines.append("\n" + str(json_obj["hadith_text"]))
-    if "hadith_source" in json_obj and json_obj["hadith_source"]:
-        lines.append("\n" + str(json_obj["hadith_source"]))
-    if "hadith_warning" in json_obj and json_obj["hadith_warning"]:
-        lines.append("\n⚠️ " + str(json_obj["hadith_warning"]))
-    # 7. Catatan/crosscheck dari Gemini jika ada
-    if "catatan" in json_obj and json_obj["catatan"]:
-        lines.append("\n" + str(json_obj["catatan"]))
-    if "note" in json_obj and json_obj["note"]:
-        lines.append("\n" + str(json_obj["note"]))
-    
-    return '\n'.join(lines).strip()
+    if not text:
+        return None
+    stack = []    # offsets of the objects still open
+    pending = []  # (start, end, depth) of objects that closed inside an open brace
+    pos = 0
+    while True:
+        if not stack:
+            pos = text.find('{', pos)
+            if pos < 0:
+                break
+            stack.append(pos)
+            pos += 1
+            continue
+        match = _OBJECT_TOKEN.search(text, pos)
+        if match is None:
+            break
+        i = match.start()
+        char = match.group()
+        if char == '"':
+            pos = _skip_string(text, i + 1)
+            continue
+        if char == '{':
+            stack.append(i)
+        else:
+            start = stack.pop()
+            if stack:
+                pending.append((start, i + 1, len(stack)))
+            else:
+                obj = _decode_object(text, start, i + 1)
+                if obj is not None:
+                    return obj
+                # Everything pending was nested inside this object
+                pending.clear()
+        pos = i + 1
 
-def extract_arabic_text(response):
+    # Braces left open never closed, so objects directly inside them are outermost
+    for start, end, depth in pending:
+        if bisect_left(stack, start) == depth:
+            obj = _decode_object(text, start, end)
+            if obj is not None:
+                return obj
+    return None
+
+def decode_structured_response(response):
     """
-    Extract only Arabic text from the response, removing explanations.
+    Decode a structured (JSON mode) response into its object. A response
+    that is not bare JSON (a recorded reply wrapped in a code fence or prose)
+    falls back to the first complete object in it. Returns None when there
+    is no JSON object.
     """
     if not response:
-        return ""
-    text = parse_gemini_response(response)
-    lines = text.split('\n')
-    arabic_lines = []
-    for line in lines:
-        line = line.strip()
-        if line and has_arabic_text(line):
-            arabic_lines.append(line)
-    return '\n'.join(arabic_lines)
+        return None
+    try:
+        obj = json.loads(response, strict=False)
+    except json.JSONDecodeError:
+        return find_json_object(response)
+    return obj if isinstance(obj, dict) else None
 
-def has_arabic_text(text):
+def extract_partial_json_string(response, field):
     """
-    Check if text contains Arabic characters.
+    Extract the value of a string field from a JSON response that may still be
+    incomplete (streaming). Returns the decoded text received so far, or None
+    if the field has not started yet.
     """
-    arabic_pattern = r'[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]'
-    return bool(re.search(arabic_pattern, text))
\ No newline at end of file
+    if not response:
+        return None
+    match = re.search(r'"%s"\s*:\s*"' % re.escape(field), response)
+    if not match:
+        return None
+    start = match.end()
+    i = start
+    end = len(response)
+    while i < end:
+        ch = response[i]
+        if ch == '\\':
+            # Stop before an escape sequence that has not fully arrived yet
+            width = 6 if response[i + 1:i + 2] == 'u' else 2
+            if i + width > end:
+                break
+            i += width
+            continue
+        if ch == '"':
+            break
+        i += 1
+    try:
+        return json.loads('"' + response[start:i] + '"')
+    except json.JSONDecodeError:
+        return None
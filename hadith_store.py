@@ -0,0 +1,220 @@
+"""
+Local hadith collection for Arabic Typing Helper
+
+Hadith (book, number, narrator, Arabic text, translation) are kept in
+SQLite with an FTS5 index, so "Cari hadith" can answer keyword searches
+with exact sources without asking the AI. The collection is optional and
+not bundled; load one or more dataset dumps once:
+
+    python hadith_store.py ara-bukhari.json ind-bukhari.json
+    python hadith_store.py hadits.csv
+
+JSON files are editions in the fawazahmed0/hadith-api layout (an "ara-"
+file name prefix marks the Arabic edition); CSV files need a header row
+with book, number, narrator, arabic and translation columns (Indonesian
+names such as kitab, nomor, perawi, arab and terjemahan work too).
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from quran_search import tokenize
+from quran_store import DATA_DIR
+
+HADITH_PATH = os.path.join(DATA_DIR, "hadith.sqlite3")
+
+FIELDS = ("book", "number", "narrator", "arabic", "translation")
+# CSV header names accepted for each field
+_CSV_COLUMNS = {
+    "book": ("book", "kitab", "collection", "source"),
+    "number": ("number", "nomor", "no", "hadithnumber", "hadith_number"),
+    "narrator": ("narrator", "perawi", "rawi"),
+    "arabic": ("arabic", "arab", "text_ar", "arabic_text"),
+    "translation": ("translation", "terjemahan", "text_id", "text", "indonesian"),
+}
+
+# Terms in more than this share of the collection are too common to rank by
+COMMON_FRACTION = 0.2
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _index_text(text):
+    # The same terms quran_search uses, so Arabic matches without harakat
+    return " ".join(tokenize(text or ""))
+
+
+def _match_query(terms, operator):
+    return f" {operator} ".join(f'"{term}"' for term in terms)
+
+
+class HadithStore:
+    """SQLite hadith table with a contentless FTS5 index over its text columns"""
+
+    def __init__(self, path=HADITH_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS hadith ("
+            " id INTEGER PRIMARY KEY, book TEXT NOT NULL, number TEXT NOT NULL,"
+            " narrator TEXT NOT NULL DEFAULT '', arabic TEXT NOT NULL DEFAULT '',"
+            " translation TEXT NOT NULL DEFAULT '', UNIQUE (book, number))"
+        )
+        self.conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS hadith_fts"
+            " USING fts5(book, narrator, arabic, translation, content='')"
+        )
+        self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS hadith_vocab USING fts5vocab(hadith_fts, row)")
+        self.conn.commit()
+        self.total = self.count()
+
+    def close(self):
+        self.conn.close()
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM hadith").fetchone()[0]
+
+    def add(self, records):
+        """
+        Insert (book, number, narrator, arabic, translation) records; a record
+        for a hadith already stored fills in the fields it has. Call reindex()
+        afterwards.
+        """
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO hadith (book, number, narrator, arabic, translation) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (book, number) DO UPDATE SET"
+                " narrator = CASE WHEN excluded.narrator != '' THEN excluded.narrator ELSE narrator END,"
+                " arabic = CASE WHEN excluded.arabic != '' THEN excluded.arabic ELSE arabic END,"
+                " translation = CASE WHEN excluded.translation != '' THEN excluded.translation ELSE translation END",
+                records,
+            )
+
+    def reindex(self):
+        """Rebuild the search index from the hadith table"""
+        rows = self.conn.execute("SELECT id, book, narrator, arabic, translation FROM hadith").fetchall()
+        with self.conn:
+            self.conn.execute("INSERT INTO hadith_fts (hadith_fts) VALUES ('delete-all')")
+            self.conn.executemany(
+                "INSERT INTO hadith_fts (rowid, book, narrator, arabic, translation) VALUES (?, ?, ?, ?, ?)",
+                ((row[0], *(_index_text(value) for value in row[1:])) for row in rows),
+            )
+        self.total = len(rows)
+
+    def document_frequency(self, term):
+        row = self.conn.execute("SELECT doc FROM hadith_vocab WHERE term = ?", (term,)).fetchone()
+        return row[0] if row else 0
+
+    def _match(self, terms, operator, k, ranked):
+        order = "bm25(hadith_fts)" if ranked else "hadith_fts.rowid"
+        return self.conn.execute(
+            "SELECT h.book, h.number, h.narrator, h.arabic, h.translation"
+            " FROM hadith_fts JOIN hadith h ON h.id = hadith_fts.rowid"
+            f" WHERE hadith_fts MATCH ? ORDER BY {order} LIMIT ?",
+            (_match_query(terms, operator), k),
+        ).fetchall()
+
+    def search(self, query, k=5):
+        """
+        Top k (book, number, narrator, arabic, translation) for query, best
+        first: hadith with all of its terms, or any of them if none has all.
+
+        BM25 scores every matching hadith, so terms found in most of the
+        collection are left out of the "any" search, and a query made only of
+        such terms returns its first matches unranked.
+        """
+        frequencies = {term: self.document_frequency(term) for term in dict.fromkeys(tokenize(query))}
+        known = [term for term, frequency in frequencies.items() if frequency]
+        if not known:
+            return []
+        rare = [term for term in known if frequencies[term] <= COMMON_FRACTION * self.total]
+        if not rare:
+            return self._match(known, "AND", k, False) or self._match(known, "OR", k, False)
+        if len(known) == len(frequencies):
+            # A rare term keeps the intersection, and so its ranking, small
+            rows = self._match(known, "AND", k, True)
+            if rows or len(known) == 1:
+                return rows
+        return self._match(rare, "OR", k, True)
+
+
+def get_hadith_store():
+    """Shared store opened on first use, or None when no collection has been loaded"""
+    global _store
+    with _store_lock:
+        if _store is None and os.path.exists(HADITH_PATH):
+            _store = HadithStore(HADITH_PATH)
+        return _store
+
+
+def read_csv(path):
+    """(book, number, narrator, arabic, translation) records of a CSV dump"""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        header = {name.strip().lower(): name for name in reader.fieldnames or ()}
+        columns = {}
+        for field, names in _CSV_COLUMNS.items():
+            columns[field] = next((header[name] for name in names if name in header), None)
+        missing = [field for field in ("book", "number") if columns[field] is None]
+        if missing:
+            raise ValueError(f"{path}: no {' or '.join(missing)} column")
+        for row in reader:
+            yield tuple((row.get(columns[field]) or "").strip() if columns[field] else "" for field in FIELDS)
+
+
+def _hadith_number(value):
+    # Numbers are ints, or floats such as 1.1 for sub-numbered hadith
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def read_hadith_api(path):
+    """Records of one fawazahmed0/hadith-api edition; its text is Arabic for "ara-" files"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    try:
+        book = data["metadata"]["name"]
+        hadiths = data["hadiths"]
+    except (KeyError, TypeError):
+        raise ValueError(f"{path}: not a hadith-api edition")
+    arabic = os.path.basename(path).startswith("ara")
+    for hadith in hadiths:
+        text = (hadith.get("text") or "").strip()
+        if not text:
+            continue
+        number = _hadith_number(hadith["hadithnumber"])
+        yield (book, number, "", text, "") if arabic else (book, number, "", "", text)
+
+
+def load_files(paths, store):
+    """Add the records of each dump to store and rebuild its index"""
+    for path in paths:
+        records = read_hadith_api(path) if path.lower().endswith(".json") else read_csv(path)
+        store.add(records)
+    store.reindex()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load hadith dataset dumps into the local hadith store")
+    parser.add_argument("files", nargs="+", help="hadith-api JSON editions or CSV files")
+    parser.add_argument("-o", "--output", default=HADITH_PATH, help="store file (default: %(default)s)")
+    args = parser.parse_args(argv)
+    try:
+        store = HadithStore(args.output)
+        load_files(args.files, store)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"{store.count()} hadith -> {args.output}")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Icon cache for Arabic Typing Helper
+"""
+
+import os
+import re
+from importlib.util import find_spec
+from PySide6.QtCore import QSize
+from PySide6.QtGui import QIcon, QIconEngine, QPixmap, QGuiApplication
+from PySide6.QtWidgets import QApplication, QStyleOption
+from settings_manager import get_user_cache_dir
+
+_icons = {}
+_pixmaps = {}
+_cache_dir = None
+
+
+def get_cache_dir():
+    """Per-qtawesome-install folder, so an upgrade never serves stale glyphs"""
+    global _cache_dir
+    if _cache_dir is None:
+        # Stamp with the install time instead of reading package metadata,
+        # which would cost more than the icons it saves at startup
+        spec = find_spec("qtawesome")
+        stamp = int(os.path.getmtime(spec.origin)) if spec and spec.origin else 0
+        _cache_dir = os.path.join(get_user_cache_dir(), "icons", f"qtawesome-{stamp}")
+    return _cache_dir
+
+
+class CachedIconEngine(QIconEngine):
+    """Render a qtawesome icon at whatever size and pixel ratio Qt asks for"""
+
+    def __init__(self, name, color):
+        super().__init__()
+        self.name = name
+        self.color = color
+
+    def clone(self):
+        return CachedIconEngine(self.name, self.color)
+
+    def scaledPixmap(self, size, mode, state, scale):
+        side = min(size.width(), size.height())
+        pixmap = load_pixmap(self.name, self.color, side, scale)
+        if mode != QIcon.Normal and isinstance(QApplication.instance(), QApplication):
+            # Greyed out for disabled buttons, as a plain QIcon(QPixmap) would be
+            pixmap = QApplication.style().generatedIconPixmap(mode, pixmap, QStyleOption())
+        return pixmap
+
+    def pixmap(self, size, mode, state):
+        return self.scaledPixmap(size, mode, state, 1.0)
+
+    def paint(self, painter, rect, mode, state):
+        ratio = painter.device().devicePixelRatioF() if painter.device() else 1.0
+        pixmap = self.scaledPixmap(rect.size(), mode, state, ratio)
+        painter.drawPixmap(rect, pixmap)
+
+
+def get_icon(name, color):
+    """
+    Return a qtawesome icon that is rasterised at most once per name, color,
+    size and pixel ratio, so toolbar buttons and window icons are both sharp
+    """
+    key = (name, color)
+    icon = _icons.get(key)
+    if icon is None:
+        icon = QIcon(CachedIconEngine(name, color))
+        _icons[key] = icon
+    return icon
+
+
+def load_pixmap(name, color, size, ratio=None):
+    """Load the rendered icon from memory or disk, rasterising it with qtawesome on a miss"""
+    if ratio is None:
+        app = QGuiApplication.instance()
+        ratio = app.devicePixelRatio() if app else 1.0
+    key = (name, color, size, ratio)
+    pixmap = _pixmaps.get(key)
+    if pixmap is not None:
+        return pixmap
+    file_name = re.sub(r"[^\w.-]", "_", f"{name}_{color}_{size}@{ratio:g}x") + ".png"
+    path = os.path.join(get_cache_dir(), file_name)
+
+    pixmap = QPixmap(path) if os.path.exists(path) else QPixmap()
+    if pixmap.isNull():
+        # Only a cache miss pays for loading the icon fonts
+        import qtawesome as qta
+        pixmap = qta.icon(name, color=color).pixmap(QSize(size, size), ratio)
+        try:
+            os.makedirs(get_cache_dir(), exist_ok=True)
+            pixmap.save(path, "PNG")
+        except OSError:
+            pass
+    pixmap.setDevicePixelRatio(ratio)
+    _pixmaps[key] = pixmap
+    return pixmap
@@ -0,0 +1,191 @@
+"""
+Prompt templates and response schemas for Gemini actions
+
+The instructions every action shares (catatan, penjelasan, sumber) live in
+SYSTEM_INSTRUCTION, which is sent as the model's system instruction instead
+of being repeated in each prompt. Each action also has a response schema:
+the request asks for a JSON response of that shape, so the prompts no longer
+spell out the answer format. The per-action parts are assembled once at
+import; building a prompt only appends the user's input to a prepared prefix.
+"""
+
+SYSTEM_INSTRUCTION = (
+    "Kamu membantu pengguna menulis dan memeriksa teks Arab. "
+    'Field "catatan": peringatan crosscheck hasil AI dengan sumber Al-Qur\'an/hadith sahih '
+    "atau bertanya ke ustadz/guru; singkat, jelas, maksimal 1 kalimat, sebutkan bahwa hasil ini dari AI, "
+    "kalimatnya bervariasi, bukan penjelasan konten dan bukan salinan contoh literal. "
+    'Field "penjelasan": penjelasan singkat dan relevan dengan permintaan (makna, tafsir, konteks), '
+    "maksimal 2 kalimat. "
+    'Field "sumber" (jika diminta): sumber yang sebenarnya, bukan contoh format.'
+)
+
+
+def _schema(fields, optional=()):
+    """
+    Response schema of a JSON object with string fields. fields maps each
+    field to its description ("" for none); every field not in optional is
+    required.
+    """
+    properties = {}
+    for name, description in fields.items():
+        properties[name] = {"type": "string", "description": description} if description else {"type": "string"}
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": [name for name in fields if name not in optional],
+    }
+
+
+# Gemini writes the fields of a response in alphabetical order (the SDK
+# cannot send propertyOrdering), so the text shown in the editor is named
+# "answer" to stream first, ahead of catatan and penjelasan
+
+# Described in SYSTEM_INSTRUCTION
+_COMMON_FIELDS = {"penjelasan": "", "catatan": ""}
+
+# (instruction, result description) of the actions that work on the editor text
+_TEXT_ACTIONS = {
+    "Tulis ulang dalam Arab": ("Tuliskan ulang kalimat berikut dalam huruf Arab dengan harakat yang benar.",
+                               "teks arab dengan harakat yang benar"),
+    "Perbaiki (ejaan/harakat)": ("Perbaiki ejaan dan harakat pada teks Arab berikut.",
+                                 "teks arab yang sudah diperbaiki"),
+    "Cek kesalahan": ("Cek dan perbaiki kesalahan pada teks Arab berikut.",
+                      "teks arab yang sudah diperbaiki"),
+    "Auto harakat": ("Tambahkan harakat yang benar pada teks Arab berikut.",
+                     "teks arab dengan harakat lengkap"),
+}
+# Prepared prefixes; the editor text is appended as-is
+TEXT_PROMPTS = {
+    choice: f"{instruction}\n\nTeks input: "
+    for choice, (instruction, _) in _TEXT_ACTIONS.items()
+}
+TEXT_SCHEMAS = {
+    choice: _schema({"answer": result, **_COMMON_FIELDS})
+    for choice, (_, result) in _TEXT_ACTIONS.items()
+}
+
+CUSTOM_SCHEMA = _schema({"answer": "", **_COMMON_FIELDS})
+
+_AYAT_RESULT = {"answer": "teks ayat arab dengan harakat"}
+_AYAT_SOURCE = {"sumber": "Nama Surah: Nomor Ayat; jika tidak tahu pasti, sebisa mungkin"}
+# (request line, field description) per optional part of an ayat answer
+_AYAT_OPTIONS = {
+    "arti": ("Sertakan juga artinya dalam bahasa Indonesia.", "arti dalam bahasa Indonesia"),
+    "cara_baca": ("Sertakan juga cara bacanya (latin/transliterasi).", "cara baca latin/transliterasi"),
+    "asbabun_nuzul": ("Sertakan juga asbabun nuzul jika tersedia.", "asbabun nuzul, kosong jika tidak tersedia"),
+}
+
+_HADITH_PROMPT = (
+    'Carikan hadith sahih yang berkaitan dengan topik: "{topik}"\n'
+    "- HANYA hadith yang benar-benar SAHIH dari Bukhari, Muslim, atau koleksi sahih lainnya\n"
+    "- Jika hadith diragukan atau tidak sahih, beri peringatan jelas; jika tidak ada hadith sahih tentang topik ini, katakan dengan jujur\n"
+    "- Sertakan sumber yang jelas (nama kitab, nomor hadith)"
+)
+HADITH_SCHEMA = _schema(
+    {
+        "answer": "teks hadith bahasa Arab, jika ada",
+        "hadith_text": "terjemahan Indonesia",
+        "hadith_source": "kitab, nomor, perawi",
+        "hadith_warning": "peringatan jika diragukan atau saran cross-check ke ustadz/guru, jika perlu",
+        **_COMMON_FIELDS,
+        "sumber": "Nama Kitab: Nomor Hadith",
+    },
+    optional=("hadith_warning",),
+)
+
+
+def text_prompt(choice, user_text):
+    return TEXT_PROMPTS[choice] + user_text
+
+
+def custom_prompt(user_prompt):
+    return user_prompt.strip()
+
+
+def ayat_prompt(context="", surah="", ayat="", options=()):
+    """
+    Prompt for "Cari ayat": by topic when neither surah nor ayat is given,
+    otherwise by reference. options names the optional parts to include
+    (keys of _AYAT_OPTIONS).
+    """
+    if not surah and not ayat and context:
+        lines = [f'Carikan ayat Al-Qur\'an yang relevan dengan topik atau konteks berikut: "{context}". '
+                 "Tampilkan ayat Arab lengkap dengan harakat."]
+    else:
+        reference = "Tulis ayat Al-Qur'an"
+        if surah:
+            reference += f" surah {surah}"
+        if ayat:
+            reference += f" ayat {ayat}"
+        lines = [reference + " dalam huruf Arab lengkap dengan harakat."]
+        if context:
+            lines.append(f'Jika memungkinkan, prioritaskan ayat yang relevan dengan konteks/topik berikut: "{context}".')
+    for option in options:
+        lines.append(_AYAT_OPTIONS[option][0])
+    return "\n".join(lines)
+
+
+def ayat_select_prompt(context, candidates, limit, options=()):
+    """
+    Prompt for choosing among the verses the local search found for a topic.
+    candidates are (key, description) pairs; the ayat text itself comes from
+    the local store, so only the choice and the explanation are asked for.
+    """
+    lines = [f'Pilih paling banyak {limit} ayat yang paling relevan dengan topik atau konteks berikut: "{context}", '
+             "hanya dari kandidat hasil pencarian di bawah, urutkan dari yang paling relevan. "
+             "Jawab dengan kunci kandidatnya dan jangan tuliskan teks ayatnya.",
+             "Kandidat:"]
+    lines.extend(f"- {key}: {description}" for key, description in candidates)
+    for option in options:
+        lines.append(_AYAT_OPTIONS[option][0] + " Untuk ayat-ayat yang dipilih, sesuai urutannya.")
+    return "\n".join(lines)
+
+
+def ayat_explain_prompt(reference, verses_text, context="", options=()):
+    """
+    Prompt for the tafsir/context of ayat already looked up locally: the text
+    is given, so only the explanation and the optional parts are asked for.
+    Without verses_text (a long range) the ayat are explained from the
+    citation alone.
+    """
+    if verses_text:
+        lines = [f"{reference}:\n{verses_text}\n",
+                 "Jelaskan makna dan tafsir singkat ayat di atas tanpa menuliskan ulang teks ayatnya."]
+    else:
+        lines = [f"Jelaskan makna dan tafsir singkat {reference} secara garis besar tanpa menuliskan teks ayatnya."]
+    if context:
+        lines.append(f'Kaitkan penjelasannya dengan konteks/topik berikut: "{context}".')
+    for option in options:
+        lines.append(_AYAT_OPTIONS[option][0])
+    return "\n".join(lines)
+
+
+def ayat_schema(options=(), text_known=False):
+    """
+    Response schema of ayat_prompt() with the same options, or of
+    ayat_explain_prompt() with text_known (no answer or sumber fields)
+    """
+    fields = {} if text_known else dict(_AYAT_RESULT)
+    for option in options:
+        fields[option] = _AYAT_OPTIONS[option][1]
+    fields.update(_COMMON_FIELDS)
+    if not text_known:
+        fields.update(_AYAT_SOURCE)
+    return _schema(fields, optional=("asbabun_nuzul",))
+
+
+def ayat_select_schema(keys, options=()):
+    """Response schema of ayat_select_prompt(): the chosen candidate keys, then the explanation"""
+    schema = ayat_schema(options, text_known=True)
+    schema["properties"]["ayat"] = {
+        "type": "array",
+        "description": "kunci kandidat yang dipilih, dari yang paling relevan",
+        "items": {"type": "string", "format": "enum", "enum": list(keys)},
+    }
+    schema["required"].append("ayat")
+    return schema
+
+
+def hadith_prompt(topik):
+    return _HADITH_PROMPT.format(topik=topik)
+
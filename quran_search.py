@@ -0,0 +1,205 @@
+"""
+Offline topic search over the Quran for Arabic Typing Helper
+
+An inverted index over the Indonesian translation and the Arabic text
+(with harakat and letter variants normalised away) ranks verses for a
+topic with BM25. The index is built once from the quran_store files after
+they exist:
+
+    python quran_search.py
+
+and opened with mmap on the first search; the term list is only decoded
+then. File layout, little endian:
+
+    header    magic "ATHI", version (u16), reserved (u16), verse count (u32),
+              term count (u32), average verse length in tokens (f32)
+    lengths   verse count u16 token counts, in mushaf order
+    starts    term count + 1 u32 indexes into the postings
+    postings  (verse index u16, term frequency u16) pairs, grouped by term
+    terms     the sorted terms, UTF-8, joined by newlines
+"""
+
+import argparse
+import heapq
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+from collections import Counter
+
+from quran_store import (DATA_DIR, QURAN_PATH, TRANSLATION_PATH, VERSE_COUNT, VerseStore, surah_indexes,
+                         verse_reference)
+
+INDEX_PATH = os.path.join(DATA_DIR, "quran-index.bin")
+
+MAGIC = b"ATHI"
+VERSION = 1
+_HEADER = struct.Struct("<4sHHIIf")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_MARKS = re.compile("[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")
+_LETTERS = str.maketrans({
+    "\u0622": "\u0627", "\u0623": "\u0627", "\u0625": "\u0627", "\u0671": "\u0627",
+    "\u0649": "\u064A", "\u0626": "\u064A", "\u0624": "\u0648", "\u0629": "\u0647",
+})
+_WORD = re.compile(r"\w+")
+# Function words that are in most verses of the Indonesian translation
+STOPWORDS = frozenset("""
+    ada adalah akan atau bagi bahwa dan dari dengan di dia ia ini itu juga kamu kami
+    ke kepada maka mereka oleh pada sebagai telah tentang untuk yang
+""".split())
+
+_search = None
+_search_lock = threading.Lock()
+
+
+def normalize_arabic(text):
+    """Drop harakat, Quranic marks and tatweel and merge alef, ya, ta marbuta variants"""
+    return _MARKS.sub("", text).translate(_LETTERS)
+
+
+def tokenize(text):
+    """Index terms of a verse or query, Arabic and Indonesian alike"""
+    return [word for word in _WORD.findall(normalize_arabic(text.lower()))
+            if len(word) > 1 and not word.isdigit() and word not in STOPWORDS]
+
+
+def build_index(stores, path=INDEX_PATH):
+    """Write an index over the verse texts of stores (VerseStore objects)"""
+    postings = {}
+    lengths = []
+    for index in range(VERSE_COUNT):
+        counts = Counter()
+        for store in stores:
+            counts.update(tokenize(store.text_at(index)))
+        lengths.append(min(sum(counts.values()), 0xFFFF))
+        for term, count in counts.items():
+            postings.setdefault(term, []).append((index, min(count, 0xFFFF)))
+    terms = sorted(postings)
+    starts = [0]
+    entries = array("H")
+    for term in terms:
+        for index, count in postings[term]:
+            entries.append(index)
+            entries.append(count)
+        starts.append(len(entries) // 2)
+    if sys.byteorder == "big":
+        entries.byteswap()
+    average = sum(lengths) / len(lengths)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, 0, VERSE_COUNT, len(terms), average))
+        f.write(struct.pack(f"<{len(lengths)}H", *lengths))
+        f.write(struct.pack(f"<{len(starts)}I", *starts))
+        f.write(entries.tobytes())
+        f.write("\n".join(terms).encode("utf-8"))
+    os.replace(tmp_path, path)
+    return len(terms)
+
+
+class QuranSearch:
+    """BM25 search over an index file built by build_index()"""
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count, term_count, self.average = _HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION or count != VERSE_COUNT:
+            self.data.close()
+            raise ValueError(f"{path} is not a Quran index built by this version")
+        self.term_count = term_count
+        self.starts_at = _HEADER.size + 2 * count
+        self.postings_at = self.starts_at + 4 * (term_count + 1)
+        self.lengths = self._array("H", _HEADER.size, count)
+        self.norms = None
+        self.terms = None
+        self.lock = threading.Lock()
+
+    def _array(self, typecode, offset, count):
+        values = array(typecode)
+        values.frombytes(self.data[offset:offset + values.itemsize * count])
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    def close(self):
+        self.data.close()
+
+    def term_ids(self):
+        """{term: term id}, decoded from the file on first use"""
+        with self.lock:
+            if self.terms is None:
+                # Length normalisation of each verse, the per-verse part of BM25
+                self.norms = [K1 * (1 - B + B * length / self.average) for length in self.lengths]
+                end = self.postings_at + 4 * struct.unpack_from("<I", self.data, self.postings_at - 4)[0]
+                names = self.data[end:].decode("utf-8").split("\n") if self.term_count else []
+                self.terms = {term: term_id for term_id, term in enumerate(names)}
+            return self.terms
+
+    def postings(self, term_id):
+        """Flat [verse index, frequency, ...] of a term"""
+        start, end = struct.unpack_from("<2I", self.data, self.starts_at + 4 * term_id)
+        return self._array("H", self.postings_at + 4 * start, 2 * (end - start))
+
+    def search(self, query, k=10, surah=None):
+        """Top k [(surah, ayat, score)] for query, best first, only from surah if given"""
+        terms = self.term_ids()
+        norms = self.norms
+        scores = {}
+        for term in set(tokenize(query)):
+            term_id = terms.get(term)
+            if term_id is None:
+                continue
+            entries = self.postings(term_id)
+            frequency = len(entries) // 2
+            idf = math.log(1 + (VERSE_COUNT - frequency + 0.5) / (frequency + 0.5))
+            weight = idf * (K1 + 1)
+            for index, count in zip(entries[0::2], entries[1::2]):
+                scores[index] = scores.get(index, 0.0) + weight * count / (count + norms[index])
+        if surah:
+            verses = surah_indexes(surah)
+            scores = {index: score for index, score in scores.items() if index in verses}
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(*verse_reference(index), score) for index, score in best]
+
+
+def get_quran_search():
+    """Shared index opened on first use, or None when it has not been built"""
+    global _search
+    with _search_lock:
+        if _search is None and os.path.exists(INDEX_PATH):
+            _search = QuranSearch(INDEX_PATH)
+        return _search
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the offline Quran search index from the quran_store files")
+    parser.add_argument("stores", nargs="*",
+                        help=f"store files to index (default: those of {TRANSLATION_PATH} and {QURAN_PATH} that exist)")
+    parser.add_argument("-o", "--output", default=INDEX_PATH, help="index file (default: %(default)s)")
+    args = parser.parse_args(argv)
+    paths = args.stores or [path for path in (TRANSLATION_PATH, QURAN_PATH) if os.path.exists(path)]
+    if not paths:
+        print("Error: no Quran store found; build one with quran_store.py first", file=sys.stderr)
+        return 1
+    try:
+        stores = [VerseStore(path) for path in paths]
+        term_count = build_index(stores, args.output)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"{term_count} terms -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
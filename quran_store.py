@@ -0,0 +1,268 @@
+"""
+Offline Quran text store for Arabic Typing Helper
+
+Verse texts live in a compact binary file that is opened with mmap, so a
+lookup by (surah, ayat) is two offset reads and one slice, with nothing
+loaded up front. The file is built once from a Tanzil text dump (one
+"sura|aya|text" line per verse, https://tanzil.net/download/):
+
+    python quran_store.py quran-uthmani.txt
+    python quran_store.py id.indonesian.txt -o data/quran-id.bin
+
+The second file is the Indonesian translation, searched by quran_search.
+
+File layout, little endian:
+
+    header   magic "ATHQ", version (u16), reserved (u16), verse count (u32)
+    offsets  verse count + 1 u32 offsets into the text block, in mushaf order
+    text     the UTF-8 verse texts back to back
+"""
+
+import argparse
+import mmap
+from bisect import bisect_right
+import os
+import re
+import struct
+import sys
+import threading
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+QURAN_PATH = os.path.join(DATA_DIR, "quran.bin")
+TRANSLATION_PATH = os.path.join(DATA_DIR, "quran-id.bin")
+
+MAGIC = b"ATHQ"
+VERSION = 1
+_HEADER = struct.Struct("<4sHHI")
+_SPAN = struct.Struct("<2I")
+
+# (name, number of ayat) per surah, in mushaf order
+SURAHS = (
+    ("Al-Fatihah", 7), ("Al-Baqarah", 286), ("Ali 'Imran", 200), ("An-Nisa'", 176),
+    ("Al-Ma'idah", 120), ("Al-An'am", 165), ("Al-A'raf", 206), ("Al-Anfal", 75),
+    ("At-Taubah", 129), ("Yunus", 109), ("Hud", 123), ("Yusuf", 111),
+    ("Ar-Ra'd", 43), ("Ibrahim", 52), ("Al-Hijr", 99), ("An-Nahl", 128),
+    ("Al-Isra'", 111), ("Al-Kahf", 110), ("Maryam", 98), ("Taha", 135),
+    ("Al-Anbiya'", 112), ("Al-Hajj", 78), ("Al-Mu'minun", 118), ("An-Nur", 64),
+    ("Al-Furqan", 77), ("Asy-Syu'ara'", 227), ("An-Naml", 93), ("Al-Qasas", 88),
+    ("Al-'Ankabut", 69), ("Ar-Rum", 60), ("Luqman", 34), ("As-Sajdah", 30),
+    ("Al-Ahzab", 73), ("Saba'", 54), ("Fatir", 45), ("Yasin", 83),
+    ("As-Saffat", 182), ("Sad", 88), ("Az-Zumar", 75), ("Gafir", 85),
+    ("Fussilat", 54), ("Asy-Syura", 53), ("Az-Zukhruf", 89), ("Ad-Dukhan", 59),
+    ("Al-Jasiyah", 37), ("Al-Ahqaf", 35), ("Muhammad", 38), ("Al-Fath", 29),
+    ("Al-Hujurat", 18), ("Qaf", 45), ("Az-Zariyat", 60), ("At-Tur", 49),
+    ("An-Najm", 62), ("Al-Qamar", 55), ("Ar-Rahman", 78), ("Al-Waqi'ah", 96),
+    ("Al-Hadid", 29), ("Al-Mujadalah", 22), ("Al-Hasyr", 24), ("Al-Mumtahanah", 13),
+    ("As-Saff", 14), ("Al-Jumu'ah", 11), ("Al-Munafiqun", 11), ("At-Tagabun", 18),
+    ("At-Talaq", 12), ("At-Tahrim", 12), ("Al-Mulk", 30), ("Al-Qalam", 52),
+    ("Al-Haqqah", 52), ("Al-Ma'arij", 44), ("Nuh", 28), ("Al-Jinn", 28),
+    ("Al-Muzzammil", 20), ("Al-Muddassir", 56), ("Al-Qiyamah", 40), ("Al-Insan", 31),
+    ("Al-Mursalat", 50), ("An-Naba'", 40), ("An-Nazi'at", 46), ("'Abasa", 42),
+    ("At-Takwir", 29), ("Al-Infitar", 19), ("Al-Mutaffifin", 36), ("Al-Insyiqaq", 25),
+    ("Al-Buruj", 22), ("At-Tariq", 17), ("Al-A'la", 19), ("Al-Gasyiyah", 26),
+    ("Al-Fajr", 30), ("Al-Balad", 20), ("Asy-Syams", 15), ("Al-Lail", 21),
+    ("Ad-Duha", 11), ("Asy-Syarh", 8), ("At-Tin", 8), ("Al-'Alaq", 19),
+    ("Al-Qadr", 5), ("Al-Bayyinah", 8), ("Az-Zalzalah", 8), ("Al-'Adiyat", 11),
+    ("Al-Qari'ah", 11), ("At-Takasur", 8), ("Al-'Asr", 3), ("Al-Humazah", 9),
+    ("Al-Fil", 5), ("Quraisy", 4), ("Al-Ma'un", 7), ("Al-Kausar", 3),
+    ("Al-Kafirun", 6), ("An-Nasr", 3), ("Al-Lahab", 5), ("Al-Ikhlas", 4),
+    ("Al-Falaq", 5), ("An-Nas", 6),
+)
+
+# Index of each surah's first verse in mushaf order
+_FIRST_VERSE = []
+VERSE_COUNT = 0
+for _, _count in SURAHS:
+    _FIRST_VERSE.append(VERSE_COUNT)
+    VERSE_COUNT += _count
+
+_ARABIC_DIGITS = str.maketrans("0123456789", "٠١٢٣٤٥٦٧٨٩")
+_REFERENCE = re.compile(r"^\s*(.+?)\s*(?:[:\s]\s*(\d+)\s*(?:-\s*(\d+))?)?\s*$")
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _name_key(name):
+    return re.sub(r"[^a-z]", "", name.lower())
+
+
+def _build_name_index():
+    names = {}
+    for number, (name, _) in enumerate(SURAHS, 1):
+        names[_name_key(name)] = number
+        if "-" in name:
+            # Also without the article: "baqarah" for Al-Baqarah
+            names.setdefault(_name_key(name.split("-", 1)[1]), number)
+    return names
+
+
+_SURAH_NAMES = _build_name_index()
+
+
+def find_surah(text):
+    """Surah number from a number ("2") or a name ("Al-Baqarah", "baqarah"), or None"""
+    text = text.strip()
+    if text.isdigit():
+        number = int(text)
+        return number if 1 <= number <= len(SURAHS) else None
+    return _SURAH_NAMES.get(_name_key(text))
+
+
+def parse_reference(text):
+    """
+    Parse "2:255", "1:1-7", "Al-Baqarah 255" or a bare surah into
+    (surah, first ayat, last ayat). Returns None when the reference does not
+    name a surah or its ayat are out of range; a bare surah spans all ayat.
+    """
+    match = _REFERENCE.match(text)
+    if not match:
+        return None
+    surah = find_surah(match.group(1))
+    if surah is None:
+        return None
+    count = SURAHS[surah - 1][1]
+    if match.group(2) is None:
+        return surah, 1, count
+    first = int(match.group(2))
+    last = int(match.group(3)) if match.group(3) else first
+    if not 1 <= first <= last <= count:
+        return None
+    return surah, first, last
+
+
+def format_reference(surah, first, last):
+    """Citation such as "QS. Al-Fatihah: 1-7" """
+    ayat = str(first) if first == last else f"{first}-{last}"
+    return f"QS. {SURAHS[surah - 1][0]}: {ayat}"
+
+
+def format_verses(verses):
+    """Join (ayat, text) pairs mushaf style, each closed by its number in ﴿ ﴾"""
+    return " ".join(f"{text} ﴿{str(ayat).translate(_ARABIC_DIGITS)}﴾" for ayat, text in verses)
+
+
+def format_translation(verses):
+    """Translation of (ayat, text) pairs, one line per ayat numbered "(n)" when there are several"""
+    if len(verses) == 1:
+        return verses[0][1]
+    return "\n".join(f"({ayat}) {text}" for ayat, text in verses)
+
+
+class VerseStore:
+    """Read-only view of a store file built by build_store()"""
+
+    def __init__(self, path=QURAN_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count = _HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION or count != VERSE_COUNT:
+            self.data.close()
+            raise ValueError(f"{path} is not a Quran store built by this version")
+        self.text_start = _HEADER.size + 4 * (count + 1)
+
+    def close(self):
+        self.data.close()
+
+    def text_at(self, index):
+        """Text of the verse at index in mushaf order"""
+        start, end = _SPAN.unpack_from(self.data, _HEADER.size + 4 * index)
+        return self.data[self.text_start + start:self.text_start + end].decode("utf-8")
+
+    def verse(self, surah, ayat):
+        return self.text_at(_FIRST_VERSE[surah - 1] + ayat - 1)
+
+    def verses(self, surah, first, last):
+        """[(ayat, text)] for first..last of surah"""
+        base = _FIRST_VERSE[surah - 1] - 1
+        return [(ayat, self.text_at(base + ayat)) for ayat in range(first, last + 1)]
+
+    def lookup(self, reference):
+        """(citation, verses) for a reference accepted by parse_reference(), or None"""
+        parsed = parse_reference(reference)
+        if parsed is None:
+            return None
+        return format_reference(*parsed), self.verses(*parsed)
+
+
+def verse_reference(index):
+    """(surah, ayat) of the verse at index in mushaf order"""
+    surah = bisect_right(_FIRST_VERSE, index)
+    return surah, index - _FIRST_VERSE[surah - 1] + 1
+
+
+def surah_indexes(surah):
+    """range of the mushaf-order indexes of surah's verses"""
+    first = _FIRST_VERSE[surah - 1]
+    return range(first, first + SURAHS[surah - 1][1])
+
+
+def get_quran_store(path=None):
+    """
+    Shared store for path (the Arabic text by default) opened on first use,
+    or None when the data file has not been built
+    """
+    path = path or QURAN_PATH
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None and os.path.exists(path):
+            store = _stores[path] = VerseStore(path)
+        return store
+
+
+def read_tanzil(path):
+    """Verse texts in mushaf order from a Tanzil "sura|aya|text" dump"""
+    texts = [None] * VERSE_COUNT
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            # Tanzil dumps end with a "#" comment block holding the license
+            if not line or line.startswith("#"):
+                continue
+            try:
+                surah, ayat, text = line.split("|", 2)
+                surah, ayat = int(surah), int(ayat)
+            except ValueError:
+                raise ValueError(f"{path}:{line_number}: expected sura|aya|text")
+            if not (1 <= surah <= len(SURAHS) and 1 <= ayat <= SURAHS[surah - 1][1]):
+                raise ValueError(f"{path}:{line_number}: no verse {surah}:{ayat}")
+            texts[_FIRST_VERSE[surah - 1] + ayat - 1] = text
+    missing = texts.count(None)
+    if missing:
+        raise ValueError(f"{path}: {missing} verses missing")
+    return texts
+
+
+def build_store(source, path=QURAN_PATH):
+    """Write a store file for the verse texts of a Tanzil dump"""
+    blobs = [text.encode("utf-8") for text in read_tanzil(source)]
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, 0, len(blobs)))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the offline Quran store from a Tanzil text dump")
+    parser.add_argument("source", help='Tanzil text file with "sura|aya|text" lines')
+    parser.add_argument("-o", "--output", default=QURAN_PATH, help="store file (default: %(default)s)")
+    args = parser.parse_args(argv)
+    try:
+        build_store(args.source, args.output)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"{VERSE_COUNT} ayat -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
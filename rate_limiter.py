@@ -0,0 +1,168 @@
+"""
+Client-side rate limiting for AI requests
+"""
+
+import random
+import re
+import threading
+import time
+
+# Throttling shows up as HTTP 429 / gRPC RESOURCE_EXHAUSTED, wrapped in our own message
+_THROTTLE_PATTERN = re.compile(r"\b429\b|quota|resource.?exhausted|rate.?limit|too many requests", re.IGNORECASE)
+# Retry hints such as "retry_delay { seconds: 17 }" or "Please retry in 17.5s"
+_RETRY_HINT_PATTERN = re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)|retry in (\d+(?:\.\d+)?)\s*s", re.IGNORECASE)
+
+
+def estimate_tokens(text):
+    """Rough token count: about four bytes of UTF-8 per token"""
+    return max(1, len(text.encode("utf-8")) // 4)
+
+
+def is_throttle_error(error):
+    return bool(_THROTTLE_PATTERN.search(str(error)))
+
+
+def retry_hint(error):
+    """Seconds the server asked us to wait, or None"""
+    match = _RETRY_HINT_PATTERN.search(str(error))
+    return float(match.group(1) or match.group(2)) if match else None
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at per_minute / 60 per second.
+    Callers reserve up front and wait for their turn; the level may go
+    negative, which queues later callers behind earlier ones in order.
+    """
+
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount):
+        """Take amount now and return how many seconds to wait before using it"""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.level -= amount
+            return max(0.0, -self.level / self.rate)
+
+    def refund(self, amount):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budgets plus adaptive backoff.
+
+    Every throttling error doubles the pause imposed on all callers (with
+    jitter, capped at backoff_max seconds, and never shorter than a retry
+    delay the server asked for); every success halves the streak again.
+    """
+
+    def __init__(self, rpm, tpm, backoff_base=1.0, backoff_max=60.0, max_retries=5):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retries = max_retries
+        self.throttled = 0
+        self.blocked_until = 0.0
+        self.random = random.Random()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens, cancel_token):
+        """Block until a request of about tokens tokens may be sent"""
+        wait = 0.0
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        with self.lock:
+            wait = max(wait, self.blocked_until - time.monotonic())
+        try:
+            cancel_token.sleep(wait)
+        except Exception:
+            self.release(tokens)
+            raise
+
+    def release(self, tokens):
+        """Give back a reservation that was never sent"""
+        if self.requests:
+            self.requests.refund(1)
+        if self.tokens:
+            self.tokens.refund(tokens)
+
+    def charge(self, tokens):
+        """Count tokens that were only known after the response (the output)"""
+        if self.tokens and tokens:
+            self.tokens.reserve(tokens)
+
+    def on_success(self):
+        with self.lock:
+            self.throttled //= 2
+
+    def on_throttled(self, error=None):
+        """Record a throttling response and return the imposed pause in seconds"""
+        with self.lock:
+            self.throttled += 1
+            ceiling = min(self.backoff_max, self.backoff_base * 2 ** (self.throttled - 1))
+            # Equal jitter: half of the pause is fixed, half is random
+            delay = ceiling / 2 + self.random.uniform(0, ceiling / 2)
+            hint = retry_hint(error) if error is not None else None
+            if hint is not None:
+                delay = max(delay, hint)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            return delay
+
+    def call(self, tokens, send, cancel_token):
+        """
+        Run send(), a request of about tokens input tokens, within the budgets,
+        retrying throttled attempts with backoff. send() returns the response
+        text, which is charged against the token budget.
+        """
+        attempt = 0
+        while True:
+            self.acquire(tokens, cancel_token)
+            try:
+                response = send()
+            except Exception as e:
+                if not is_throttle_error(e) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.on_throttled(e)
+                continue
+            self.on_success()
+            self.charge(estimate_tokens(response) if response else 0)
+            return response
+
+    def stream(self, tokens, open_stream, cancel_token):
+        """
+        Like call(), for a streamed response. Only an attempt that is throttled
+        before its first chunk is retried; later failures propagate.
+        """
+        attempt = 0
+        while True:
+            self.acquire(tokens, cancel_token)
+            chunks = []
+            try:
+                for text in open_stream():
+                    chunks.append(text)
+                    yield text
+            except Exception as e:
+                if chunks or not is_throttle_error(e) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.on_throttled(e)
+                continue
+            self.on_success()
+            self.charge(estimate_tokens("".join(chunks)) if chunks else 0)
+            return
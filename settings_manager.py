@@ -4,15 +4,77 @@ Settings Manager for Arabic Typing Helper
 
 import os
 import json
+from PySide6.QtCore import QStandardPaths
 from constants import DEFAULT_FONTS, UI_SETTINGS
 
+DEFAULT_GEMINI_SETTINGS = {
+    "api_key": "",
+    "model": "gemini-2.5-flash",
+    "temperature": 0.7,
+    "max_tokens": 8192,
+    "stream": True,
+    "timeout": 60,
+    "max_concurrent_jobs": 3,
+    "chunk_chars": 1500,
+    "chunk_retries": 2
+}
+
+DEFAULT_CACHE_SETTINGS = {
+    "enabled": True,
+    "ttl_hours": 168,
+    "max_disk_mb": 50,
+    "memory_entries": 128
+}
+
+DEFAULT_RATE_LIMIT_SETTINGS = {
+    "enabled": True,
+    "rpm": 10,
+    "tpm": 250000,
+    "max_retries": 5,
+    "backoff_base_s": 1.0,
+    "backoff_max_s": 60.0
+}
+
+DEFAULT_BACKEND_SETTINGS = {
+    "name": "gemini",
+    "recordings_path": "",
+    "latency_ms": 300,
+    "jitter_ms": 100,
+    "error_rate": 0.0,
+    "chunk_chars": 40,
+    "chunk_delay_ms": 20
+}
+
+def get_user_cache_dir():
+    """
+    Per-user cache folder (QStandardPaths.CacheLocation) for the rendered
+    icons and the response cache; the install folder may not be writable
+    """
+    return QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+
 class SettingsManager:
     def __init__(self):
         self.config_path = os.path.join(os.path.dirname(__file__), "config.json")
+        self.config_stamp = None
+        self.load_settings()
+
+    def get_config_stamp(self):
+        try:
+            stat = os.stat(self.config_path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def reload_if_changed(self):
+        """Reload config.json if it was modified since it was last read; return True if reloaded"""
+        if self.get_config_stamp() == self.config_stamp:
+            return False
         self.load_settings()
+        return True
 
     def load_settings(self):
         """Load settings from config file"""
+        self.config_stamp = self.get_config_stamp()
         try:
             if os.path.exists(self.config_path):
                 with open(self.config_path, 'r') as f:
@@ -27,9 +89,10 @@ class SettingsManager:
         return {
             "ui": UI_SETTINGS,
             "fonts": DEFAULT_FONTS,
-            "gemini": {
-                "api_key": ""
-            },
+            "gemini": dict(DEFAULT_GEMINI_SETTINGS),
+            "cache": dict(DEFAULT_CACHE_SETTINGS),
+            "rate_limit": dict(DEFAULT_RATE_LIMIT_SETTINGS),
+            "backend": dict(DEFAULT_BACKEND_SETTINGS),
             "appearance": {
                 "current_font": "Noto Sans Arabic",
                 "current_size": 20,
@@ -42,6 +105,7 @@ class SettingsManager:
         try:
             with open(self.config_path, 'w') as f:
                 json.dump(self.config, f, indent=2)
+            self.config_stamp = self.get_config_stamp()
             return True
         except:
             return False
@@ -53,6 +117,13 @@ class SettingsManager:
             api_key = self.config.get("gemini", {}).get("api_key")
         return api_key
 
+    def get_gemini_settings(self):
+        """Get Gemini connection and generation settings, with the API key resolved"""
+        gemini = dict(DEFAULT_GEMINI_SETTINGS)
+        gemini.update(self.config.get("gemini", {}))
+        gemini["api_key"] = self.get_api_key() or ""
+        return gemini
+
     def save_api_key(self, api_key):
         """Save Gemini API key to config"""
         try:
@@ -89,3 +160,21 @@ class SettingsManager:
             "size": appearance.get("current_size", 20),
             "mode": appearance.get("current_mode", "Arab")
         }
+
+    def get_cache_settings(self):
+        """Get Gemini response cache settings"""
+        cache = dict(DEFAULT_CACHE_SETTINGS)
+        cache.update(self.config.get("cache", {}))
+        return cache
+
+    def get_rate_limit_settings(self):
+        """Get request budgets (per minute) and backoff settings"""
+        rate_limit = dict(DEFAULT_RATE_LIMIT_SETTINGS)
+        rate_limit.update(self.config.get("rate_limit", {}))
+        return rate_limit
+
+    def get_backend_settings(self):
+        """Get AI backend selection and fake backend settings"""
+        backend = dict(DEFAULT_BACKEND_SETTINGS)
+        backend.update(self.config.get("backend", {}))
+        return backend
@@ -0,0 +1,200 @@
+"""
+Qt-free transliteration engine for Arabic Typing Helper
+"""
+
+import re
+from functools import lru_cache
+from constants import KEYBOARD_MAPPINGS, PEGON_MAPPING, PEGON_SEQUENCES, HARAKAT_MAPPING
+
+MODES = ("ABC", "Arabic", "Pegon")
+
+# Multi-key sequences per mode; keys are matched case-insensitively
+SEQUENCE_MAPPINGS = {
+    "Pegon": PEGON_SEQUENCES,
+}
+
+# How upper-case input letters are treated:
+#   "case"    - upper case means Shift was held (Pegon variant, ABC keeps case)
+#   "base"    - always use the unshifted character, like the on-screen keys
+#   "shifted" - always use the shifted character
+SHIFT_POLICIES = ("case", "base", "shifted")
+
+# Codepoint arrays only need to cover the ASCII keys used by the mappings;
+# anything above raises IndexError and str.translate leaves it unchanged.
+_TABLE_SIZE = 128
+
+
+def normalize_mode(mode):
+    """Map UI mode names ("Arab") to engine mode names ("Arabic")"""
+    if mode == "Arab":
+        return "Arabic"
+    if mode not in MODES:
+        raise ValueError(f"Unknown transliteration mode: {mode}")
+    return mode
+
+
+def _check_shift_policy(shift_policy):
+    if shift_policy not in SHIFT_POLICIES:
+        raise ValueError(f"Unknown shift policy: {shift_policy}")
+
+
+def _key_pairs(mode):
+    """Yield (key, base_char, shifted_char) for every mapped key of a mode"""
+    if mode == "Pegon":
+        for key, (base, shifted) in PEGON_MAPPING.items():
+            yield key, base, shifted
+        return
+    for key, char in KEYBOARD_MAPPINGS[mode].items():
+        shifted = char.upper() if mode == "ABC" else char
+        yield key, char, shifted
+    if mode != "ABC":
+        for key, char in HARAKAT_MAPPING.items():
+            yield key, char, char
+
+
+@lru_cache(maxsize=None)
+def compile_table(mode, shift_policy="case"):
+    """Compile the mapping dicts of a mode into a str.translate codepoint array"""
+    mode = normalize_mode(mode)
+    _check_shift_policy(shift_policy)
+    table = [chr(i) for i in range(_TABLE_SIZE)]
+    for key, base, shifted in _key_pairs(mode):
+        lower = key.lower()
+        upper = key.upper()
+        if shift_policy == "shifted":
+            table[ord(lower)] = shifted
+            table[ord(upper)] = shifted
+        elif shift_policy == "base":
+            table[ord(lower)] = base
+            table[ord(upper)] = base
+        else:
+            table[ord(lower)] = base
+            table[ord(upper)] = shifted
+    return table
+
+
+@lru_cache(maxsize=None)
+def _key_table(mode):
+    """Per-key lookup used for single keystrokes: key -> (base, shifted)"""
+    return {key: (base, shifted) for key, base, shifted in _key_pairs(mode)}
+
+
+def map_key(key, mode, shift=False):
+    """Map a single lower-case key to its character, or None if the key is unmapped"""
+    pair = _key_table(normalize_mode(mode)).get(key)
+    if pair is None:
+        return None
+    return pair[1] if shift else pair[0]
+
+
+class _TrieNode:
+    __slots__ = ("children", "output")
+
+    def __init__(self):
+        self.children = {}
+        self.output = None
+
+
+class SequenceState:
+    """Pending-sequence state of one typing session"""
+    __slots__ = ("node", "emitted")
+
+    def __init__(self, root):
+        self.node = root
+        self.emitted = 0
+
+
+class Transliterator:
+    """Longest-match automaton over the multi-key sequences of a mode.
+
+    Typing feeds one key at a time through feed(); translate() runs the same
+    automaton over whole strings, so both paths give identical results.
+    """
+
+    def __init__(self, mode, shift_policy="case"):
+        self.mode = normalize_mode(mode)
+        self.table = compile_table(self.mode, shift_policy)
+        self.root = _TrieNode()
+        sequences = SEQUENCE_MAPPINGS.get(self.mode, {})
+        for keys, output in sequences.items():
+            node = self.root
+            for key in keys.lower():
+                node = node.children.setdefault(key, _TrieNode())
+            node.output = output
+            if output != output.translate(self.table):
+                raise ValueError(f"Sequence output {output!r} overlaps the key table")
+        self._spans = {}
+        self._pattern = self._compile_pattern(sequences)
+
+    def _compile_pattern(self, sequences):
+        # Every trie path of two or more keys; longest first so the regex
+        # takes the same maximal walk as feed() does.
+        prefixes = {keys.lower()[:n] for keys in sequences for n in range(2, len(keys) + 1)}
+        if not prefixes:
+            return None
+        alternation = "|".join(re.escape(p) for p in sorted(prefixes, key=len, reverse=True))
+        return re.compile(alternation, re.IGNORECASE)
+
+    def start(self):
+        """Return a fresh pending-sequence state"""
+        return SequenceState(self.root)
+
+    def reset(self, state):
+        state.node = self.root
+        state.emitted = 0
+
+    def feed(self, state, key):
+        """Feed one key; return (chars_to_delete_before_cursor, text_to_insert)"""
+        lower = key.lower()
+        node = state.node.children.get(lower)
+        if node is None:
+            state.node = self.root
+            state.emitted = 0
+            node = self.root.children.get(lower)
+        single = key.translate(self.table)
+        if node is None:
+            return 0, single
+        state.node = node
+        if node.output is not None:
+            delete = state.emitted
+            state.emitted = len(node.output)
+            return delete, node.output
+        state.emitted += len(single)
+        return 0, single
+
+    def _span(self, match):
+        span = match.group()
+        output = self._spans.get(span)
+        if output is None:
+            node = self.root
+            output = span.translate(self.table)
+            for index, key in enumerate(span.lower()):
+                node = node.children[key]
+                if node.output is not None:
+                    output = node.output + span[index + 1:].translate(self.table)
+            self._spans[span] = output
+        return output
+
+    def translate(self, text):
+        """Transliterate a whole string"""
+        if self._pattern is not None:
+            text = self._pattern.sub(self._span, text)
+        return text.translate(self.table)
+
+
+@lru_cache(maxsize=None)
+def get_transliterator(mode, shift_policy="case"):
+    """Return the shared Transliterator for a mode and shift policy"""
+    _check_shift_policy(shift_policy)
+    return Transliterator(mode, shift_policy)
+
+
+def transliterate(text, mode="Arabic", shift_policy="case"):
+    """Transliterate a whole string; unmapped characters are kept as they are"""
+    return get_transliterator(mode, shift_policy).translate(text)
+
+
+def transliterate_many(texts, mode="Arabic", shift_policy="case"):
+    """Lazily transliterate an iterable of strings with a single compiled automaton"""
+    translate = get_transliterator(mode, shift_policy).translate
+    return (translate(text) for text in texts)
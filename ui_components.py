@@ -2,17 +2,86 @@
 UI Components for Arabic Typing Helper
 """
 
-from PySide6.QtWidgets import (QPushButton, QGridLayout, QScrollArea, 
+import time
+from PySide6.QtWidgets import (QPushButton, QGridLayout, QLineEdit,
                               QWidget, QTabWidget, QVBoxLayout, QHBoxLayout)
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QFont
-import qtawesome as qta
-from constants import (BASIC_HARAKAT_CHARS, ADVANCED_HARAKAT_CHARS, 
-                      SYMBOL_CHARS, KEYBOARD_ROWS, UI_SETTINGS)
+from PySide6.QtCore import QObject, Qt, QTimer
+from PySide6.QtGui import QColor, QFont, QPainter
+from icon_cache import get_icon
+import transliterator
+from char_palette import CharPaletteModel, CharPaletteView, get_palette_code_points
+from char_search import get_character_index
+from constants import BASIC_HARAKAT_CHARS, KEYBOARD_ROWS, UI_SETTINGS
+
+class HighlightOverlay(QWidget):
+    """
+    Tint painted over a lit key. It is drawn here rather than by the style,
+    so it shows under every style, including the native Windows ones that
+    ignore the palette for push button backgrounds.
+    """
+
+    def __init__(self, btn, color):
+        super().__init__(btn)
+        self.color = color
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.hide()
+
+    def paintEvent(self, event):
+        QPainter(self).fillRect(self.rect(), self.color)
+
+class HighlightScheduler(QObject):
+    """Drive every key highlight from one ticking timer and an overlay per key"""
+    
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.duration = UI_SETTINGS['highlight_duration'] / 1000
+        self.expiry = {}
+        self.overlays = {}
+        self.timer = QTimer(self)
+        self.timer.setInterval(UI_SETTINGS['highlight_tick_ms'])
+        self.timer.timeout.connect(self.tick)
+        # Translucent, so the key's label stays readable under the tint
+        self.color = QColor(UI_SETTINGS['highlight_color'])
+        self.color.setAlpha(UI_SETTINGS['highlight_alpha'])
+
+    def set_highlighted(self, btn, highlighted):
+        # Only the key's own area repaints; nothing is re-polished
+        overlay = self.overlays.get(btn)
+        if overlay is None:
+            overlay = self.overlays[btn] = HighlightOverlay(btn, self.color)
+        if highlighted:
+            overlay.setGeometry(btn.rect())
+            overlay.show()
+        else:
+            overlay.hide()
+
+    def highlight(self, btn):
+        """Highlight a button, or just extend its expiry if it is already lit"""
+        if btn not in self.expiry:
+            self.set_highlighted(btn, True)
+        self.expiry[btn] = time.monotonic() + self.duration
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def tick(self):
+        now = time.monotonic()
+        expired = [btn for btn, expiry in self.expiry.items() if expiry <= now]
+        for btn in expired:
+            del self.expiry[btn]
+            self.set_highlighted(btn, False)
+        if not self.expiry:
+            self.timer.stop()
 
 class UIComponentBuilder:
     def __init__(self, parent):
         self.parent = parent
+        self.lazy_tabs = {}
+        
+        # Shared fonts, so each button does not allocate its own QFont
+        self.harakat_font = QFont()
+        self.harakat_font.setPointSize(UI_SETTINGS['harakat_font_size'])
+        self.keyboard_font = QFont()
+        self.keyboard_font.setPointSize(UI_SETTINGS['keyboard_font_size'])
 
     def create_basic_harakat_tab(self):
         """Create basic harakat tab with enhanced styling"""
@@ -30,9 +99,7 @@ class UIComponentBuilder:
             
             # Remove key display but keep functionality
             btn = QPushButton(char)
-            btn_font = QFont()
-            btn_font.setPointSize(UI_SETTINGS['harakat_font_size'])
-            btn.setFont(btn_font)
+            btn.setFont(self.harakat_font)
             btn.setToolTip(f"{name} - Shortcut: {key}")
             btn.setMinimumHeight(UI_SETTINGS['button_min_height'])
             btn.setMinimumWidth(UI_SETTINGS['button_min_width'])
@@ -40,133 +107,133 @@ class UIComponentBuilder:
             basic_layout.addWidget(btn, row, col)
             
             self.parent.active_buttons[key] = btn
-            self.parent.original_styles[key] = ""
         
         basic_tab.setLayout(basic_layout)
         return basic_tab
 
     def create_advanced_harakat_tab(self):
-        """Create advanced harakat tab with comprehensive Unicode characters"""
-        advanced_scroll = QScrollArea()
-        advanced_scroll.setWidgetResizable(True)
-        advanced_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        advanced_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        
-        advanced_content = QWidget()
-        advanced_layout = QGridLayout()
-        advanced_layout.setSpacing(3)
-        
-        for idx, (char, name) in enumerate(ADVANCED_HARAKAT_CHARS):
-            row = idx // 3
-            col = idx % 3
-            btn = QPushButton(char)
-            btn_font = QFont()
-            btn_font.setPointSize(UI_SETTINGS['harakat_font_size'])
-            btn.setFont(btn_font)
-            btn.setToolTip(name)
-            btn.setMinimumHeight(UI_SETTINGS['button_min_height'])
-            btn.setMinimumWidth(UI_SETTINGS['button_min_width'])
-            btn.clicked.connect(lambda checked, c=char: self.parent.button_clicked(c, ""))
-            advanced_layout.addWidget(btn, row, col)
+        """Create advanced tab: every letter and mark of the Arabic Unicode blocks, with search"""
+        characters, _ = get_palette_code_points()
+        view = self.create_palette_view(characters)
+        model = view.model()
+        
+        search_box = QLineEdit()
+        search_box.setPlaceholderText("Cari nama atau kode (misal: fathah, U+064E)")
+        search_box.setClearButtonEnabled(True)
         
-        advanced_content.setLayout(advanced_layout)
-        advanced_scroll.setWidget(advanced_content)
-        return advanced_scroll
+        def update_results(query):
+            results = get_character_index().search(query) if query.strip() else characters
+            model.set_code_points(results)
+            view.scrollToTop()
+        
+        def insert_top_hit():
+            if search_box.text().strip() and model.rowCount():
+                self.parent.button_clicked(model.char_at(0), "")
+        
+        search_box.textChanged.connect(update_results)
+        search_box.returnPressed.connect(insert_top_hit)
+        
+        advanced_tab = QWidget()
+        advanced_layout = QVBoxLayout(advanced_tab)
+        advanced_layout.setContentsMargins(0, 0, 0, 0)
+        advanced_layout.addWidget(search_box)
+        advanced_layout.addWidget(view)
+        return advanced_tab
 
     def create_symbols_tab(self):
-        """Create symbols tab"""
-        symbols_scroll = QScrollArea()
-        symbols_scroll.setWidgetResizable(True)
-        symbols_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        symbols_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        
-        symbols_content = QWidget()
-        symbols_layout = QGridLayout()
-        symbols_layout.setSpacing(3)
-        
-        for idx, (char, name) in enumerate(SYMBOL_CHARS):
-            row = idx // 3
-            col = idx % 3
-            btn = QPushButton(char)
-            btn_font = QFont()
-            btn_font.setPointSize(UI_SETTINGS['harakat_font_size'])
-            btn.setFont(btn_font)
-            btn.setToolTip(name)
-            btn.setMinimumHeight(UI_SETTINGS['button_min_height'])
-            btn.setMinimumWidth(UI_SETTINGS['button_min_width'])
-            btn.clicked.connect(lambda checked, c=char: self.parent.button_clicked(c, ""))
-            symbols_layout.addWidget(btn, row, col)
-        
-        symbols_content.setLayout(symbols_layout)
-        symbols_scroll.setWidget(symbols_content)
-        return symbols_scroll
+        """Create symbols tab: punctuation, signs and Quranic annotation marks"""
+        _, symbols = get_palette_code_points()
+        return self.create_palette_view(symbols)
+
+    def create_palette_view(self, code_points):
+        model = CharPaletteModel(code_points)
+        view = CharPaletteView(model, self.harakat_font, lambda c: self.parent.button_clicked(c, ""))
+        model.setParent(view)
+        return view
 
     def create_harakat_tabs(self):
         """Create complete harakat tabs widget"""
         harakat_tabs = QTabWidget()
         harakat_tabs.setMaximumWidth(350)
         
-        # Add tabs
+        # Add tabs; Lanjutan and Simbol are only built when first shown
         harakat_tabs.addTab(self.create_basic_harakat_tab(), "Dasar")
-        harakat_tabs.addTab(self.create_advanced_harakat_tab(), "Lanjutan")
-        harakat_tabs.addTab(self.create_symbols_tab(), "Simbol")
+        harakat_tabs.addTab(self.create_lazy_tab(self.create_advanced_harakat_tab), "Lanjutan")
+        harakat_tabs.addTab(self.create_lazy_tab(self.create_symbols_tab), "Simbol")
+        harakat_tabs.currentChanged.connect(lambda index: self.build_lazy_tab(harakat_tabs.widget(index)))
         
         return harakat_tabs
 
-    def create_keyboard_layout(self):
-        """Create main keyboard layout"""
-        for i in reversed(range(self.parent.letters_layout.count())):
-            child = self.parent.letters_layout.itemAt(i).widget()
-            if child:
-                child.setParent(None)
-        
-        self.parent.active_buttons = {k: v for k, v in self.parent.active_buttons.items() if k in ["space", "copy"]}
+    def create_lazy_tab(self, factory):
+        """Create an empty tab page whose content is built by factory on first show"""
+        page = QWidget()
+        page_layout = QVBoxLayout(page)
+        page_layout.setContentsMargins(0, 0, 0, 0)
+        self.lazy_tabs[page] = factory
+        return page
+
+    def build_lazy_tab(self, page):
+        factory = self.lazy_tabs.pop(page, None)
+        if factory is not None:
+            page.layout().addWidget(factory())
+
+    def show_keyboard_page(self, mode):
+        """Switch the keyboard stack to a mode, building its page on first use"""
+        if mode not in self.parent.keyboard_pages:
+            self.parent.keyboard_pages[mode] = self.create_keyboard_page(mode)
+            self.parent.keyboard_stack.addWidget(self.parent.keyboard_pages[mode][0])
+        page, buttons = self.parent.keyboard_pages[mode]
+        self.parent.keyboard_stack.setCurrentWidget(page)
+        self.parent.page_buttons = buttons
+
+    def create_keyboard_page(self, mode):
+        """Create the keyboard page of one mode and its key -> button map"""
+        page = QWidget()
+        layout = QGridLayout(page)
+        layout.setSpacing(3)
+        buttons = {}
         
         for row_idx, row in enumerate(KEYBOARD_ROWS):
             for col_idx, key in enumerate(row):
-                btn = self.create_keyboard_button(key)
-                self.parent.letters_layout.addWidget(btn, row_idx, col_idx)
+                btn = self.create_keyboard_button(key, mode, buttons)
+                layout.addWidget(btn, row_idx, col_idx)
+        
+        return page, buttons
 
-    def create_keyboard_button(self, key):
+    def create_keyboard_button(self, key, mode, buttons):
         """Create individual keyboard button"""
         if key == '⌫':
-            btn = QPushButton(qta.icon('fa6s.delete-left', color='red'), "")
+            btn = QPushButton(get_icon('fa6s.delete-left', color='red'), "")
             btn.setToolTip("Backspace - Hapus karakter sebelumnya")
             btn.clicked.connect(self.parent.backspace)
         elif key == 'Del':
-            btn = QPushButton(qta.icon('fa6s.trash', color='orange'), "Hapus")
+            btn = QPushButton(get_icon('fa6s.trash', color='orange'), "Hapus")
             btn.setToolTip("Hapus Semua - Hapus semua teks")
             btn.clicked.connect(self.parent.clear_text)
         elif key == 'Salin':
-            btn = QPushButton(qta.icon('fa6s.copy', color='deepskyblue'), "Salin")
+            btn = QPushButton(get_icon('fa6s.copy', color='deepskyblue'), "Salin")
             btn.setToolTip("Salin teks ke clipboard - Ctrl+C")
             btn.clicked.connect(self.parent.copy_text)
-            self.parent.active_buttons["copy"] = btn
-            self.parent.original_styles["copy"] = ""
+            buttons["copy"] = btn
         elif key == 'Enter':
-            btn = QPushButton(qta.icon('fa6s.arrow-turn-down', color='green'), "Enter")
+            btn = QPushButton(get_icon('fa6s.arrow-turn-down', color='green'), "Enter")
             btn.setToolTip("Tombol Enter")
             btn.setMinimumWidth(100)
             btn.clicked.connect(lambda checked, k=key: self.parent.special_key_clicked(k))
         else:
-            mapped_char = self.parent.get_keyboard_char(key.lower())
-            if self.parent.current_mode == "Pegon":
-                mapped_char = self.parent.get_pegon_display(key.lower())
+            mapped_char = transliterator.map_key(key.lower(), mode) or key.lower()
             
-            if self.parent.current_mode == "ABC":
+            if mode == "ABC":
                 btn = QPushButton(f"{key}\n{mapped_char}")
             else:
                 btn = QPushButton(f"{mapped_char}\n{key}")
             
             btn.setToolTip(f"Karakter: {mapped_char} | Tombol: {key}")
-            btn.clicked.connect(lambda checked, c=self.parent.get_keyboard_char(key.lower()), k=key.lower(): self.parent.button_clicked(c, k))
-            self.parent.active_buttons[key.lower()] = btn
-            self.parent.original_styles[key.lower()] = ""
+            btn.clicked.connect(lambda checked, c=mapped_char, k=key.lower(): self.parent.button_clicked(c, k))
+            buttons[key.lower()] = btn
         
         # Set common button properties
-        btn_font = QFont()
-        btn_font.setPointSize(UI_SETTINGS['keyboard_font_size'])
-        btn.setFont(btn_font)
+        btn.setFont(self.keyboard_font)
         btn.setMinimumHeight(UI_SETTINGS['button_min_height'])
         
         return btn
@@ -175,7 +242,7 @@ class UIComponentBuilder:
         """Create space button and other special controls"""
         special_layout = QHBoxLayout()
         
-        space_btn = QPushButton(qta.icon('fa6s.shuttle-space', color='limegreen'), "Spasi")
+        space_btn = QPushButton(get_icon('fa6s.shuttle-space', color='limegreen'), "Spasi")
         space_btn.setToolTip("Tekan Spasi")
         btn_font = QFont()
         btn_font.setPointSize(UI_SETTINGS['button_font_size'])
@@ -186,6 +253,5 @@ class UIComponentBuilder:
         special_layout.addWidget(space_btn)
         
         self.parent.active_buttons["space"] = space_btn
-        self.parent.original_styles["space"] = ""
         
         return special_layout